@@ -73,6 +73,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Ensure database tables exist; cached, so Streamlit reruns don't repeat the DDL
+db.ensure_schema()
+
 # Initialize session state variables if they don't exist
 if 'user_id' not in st.session_state:
     # Create anonymous user
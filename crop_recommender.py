@@ -569,26 +569,34 @@ class CropRecommender:
         
         # If we have valid historical data, calculate actual values
         if not historical_df.empty:
-            if 'temp_avg' in historical_df.columns:
-                climate_data['avg_temp'] = historical_df['temp_avg'].mean()
+            # Aggregate all available columns in a single dispatch
+            agg_spec = {
+                col: op for col, op in (('temp_avg', 'mean'), ('temp_min', 'min'),
+                                        ('temp_max', 'max'), ('rain_sum', 'sum'))
+                if col in historical_df.columns
+            }
+            aggregates = historical_df[list(agg_spec)].agg(agg_spec) if agg_spec else {}
+            
+            if 'temp_avg' in agg_spec:
+                climate_data['avg_temp'] = float(aggregates['temp_avg'])
             
-            if 'temp_min' in historical_df.columns:
-                climate_data['min_temp'] = historical_df['temp_min'].min()
+            if 'temp_min' in agg_spec:
+                climate_data['min_temp'] = float(aggregates['temp_min'])
                 # Check frost risk
-                climate_data['frost_risk'] = (historical_df['temp_min'] < 0).sum() > 5
+                climate_data['frost_risk'] = np.count_nonzero(historical_df['temp_min'].to_numpy() < 0) > 5
             
-            if 'temp_max' in historical_df.columns:
-                climate_data['max_temp'] = historical_df['temp_max'].max()
+            if 'temp_max' in agg_spec:
+                climate_data['max_temp'] = float(aggregates['temp_max'])
             
             # Calculate annual rainfall
-            if 'rain_sum' in historical_df.columns:
-                climate_data['annual_rainfall'] = historical_df['rain_sum'].sum()
+            if 'rain_sum' in agg_spec:
+                climate_data['annual_rainfall'] = float(aggregates['rain_sum'])
                 
                 # Check for drought risk - look for extended periods without rain
                 if len(historical_df) > 30:  # Only if we have enough data
                     historical_df['dry_day'] = historical_df['rain_sum'] < 1
                     historical_df['dry_spell'] = (historical_df['dry_day'].rolling(window=15, min_periods=15).sum() >= 13)
-                    climate_data['drought_risk'] = historical_df['dry_spell'].any()
+                    climate_data['drought_risk'] = bool(historical_df['dry_spell'].any())
         
         return climate_data
     
@@ -614,9 +622,10 @@ class CropRecommender:
         }
         
         if not forecast_df.empty:
-            forecast_climate['avg_temp'] = forecast_df['temp'].mean()
-            forecast_climate['min_temp'] = forecast_df['temp'].min()
-            forecast_climate['max_temp'] = forecast_df['temp'].max()
+            temps = forecast_df['temp'].to_numpy(dtype=np.float64)
+            forecast_climate['avg_temp'] = float(temps.mean())
+            forecast_climate['min_temp'] = float(temps.min())
+            forecast_climate['max_temp'] = float(temps.max())
             
             # Get unique days in forecast
             if 'time' in forecast_df.columns:
@@ -625,14 +634,15 @@ class CropRecommender:
             
             # Calculate total rainfall
             if 'rain' in forecast_df.columns:
-                forecast_climate['total_rainfall'] = forecast_df['rain'].sum()
-                forecast_climate['rainy_days'] = (forecast_df['rain'] > 0).sum()
+                rain = forecast_df['rain'].to_numpy(dtype=np.float64)
+                forecast_climate['total_rainfall'] = float(rain.sum())
+                forecast_climate['rainy_days'] = int(np.count_nonzero(rain > 0))
             
             # Count high temp days
-            forecast_climate['high_temp_days'] = (forecast_df['temp'] > 30).sum()
+            forecast_climate['high_temp_days'] = int(np.count_nonzero(temps > 30))
             
             # Count low temp days
-            forecast_climate['low_temp_days'] = (forecast_df['temp'] < 5).sum()
+            forecast_climate['low_temp_days'] = int(np.count_nonzero(temps < 5))
         
         return forecast_climate
     
@@ -2,6 +2,77 @@ import pandas as pd
 import numpy as np
 import datetime
 
+# Season categories and the category code for each month number (index 0 unused)
+_SEASON_NAMES = ['Winter', 'Spring', 'Summer', 'Fall', 'Unknown']
+_SEASON_LUT = np.array([
+    4,
+    0, 0,
+    1, 1, 1,
+    2, 2, 2,
+    3, 3, 3,
+    0
+], dtype=np.int8)
+
+# Numeric column dtypes for processed frames
+FORECAST_DTYPES = {
+    'timestamp': np.int64,
+    'temp': np.float64,
+    'feels_like': np.float64,
+    'humidity': np.float64,
+    'pressure': np.float64,
+    'wind_speed': np.float64,
+    'clouds': np.float64,
+    'rain': np.float64,
+    'snow': np.float64
+}
+
+# Forecast columns that are added as zeros when absent from the API payload
+_FORECAST_REQUIRED_COLUMNS = frozenset({'rain', 'snow'})
+
+HISTORICAL_DTYPES = {
+    'temp_min': np.float64,
+    'temp_max': np.float64,
+    'temp_avg': np.float64,
+    'humidity': np.float64,
+    'clouds': np.float64,
+    'wind_speed': np.float64,
+    'rain_sum': np.float64,
+    'snow_sum': np.float64,
+    'humidity_avg': np.float64
+}
+
+def _find_runs(mask):
+    """
+    Locate runs of consecutive True values in a boolean array
+    
+    Args:
+        mask (np.ndarray): Boolean array to scan
+        
+    Returns:
+        tuple: (starts, ends) index arrays for each run, with exclusive ends
+    """
+    padded = np.concatenate(([0], np.asarray(mask, dtype=np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[0::2], edges[1::2]
+
+def _consecutive_day_groups(day_ordinals, mask, min_days):
+    """
+    Group flagged rows into runs of consecutive calendar days
+    
+    Args:
+        day_ordinals (np.ndarray): Integer day number for each row
+        mask (np.ndarray): Boolean flags selecting the rows to group
+        min_days (int): Minimum number of days for a run to be kept
+        
+    Returns:
+        list: Arrays of row positions, one per qualifying run
+    """
+    positions = np.flatnonzero(mask)
+    if positions.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(day_ordinals[positions]) > 1) + 1
+    return [run for run in np.split(positions, breaks) if run.size >= min_days]
+
 class DataProcessor:
     """
     Process weather data for analysis and visualization.
@@ -22,28 +93,21 @@ class DataProcessor:
             return pd.DataFrame()
         
         # Convert to DataFrame
-        df = pd.DataFrame(forecast_data)
-        
-        # Ensure all expected columns exist
-        if 'rain' not in df.columns:
-            df['rain'] = 0
-        if 'snow' not in df.columns:
-            df['snow'] = 0
-        
-        # Fill missing values
-        df = df.fillna(0)
+        df = pd.DataFrame.from_records(forecast_data)
+        columns = frozenset(df.columns)
         
         # Format date columns
-        if 'timestamp' in df.columns and 'time' not in df.columns:
+        if 'timestamp' in columns and 'time' not in columns:
             df['time'] = pd.to_datetime(df['timestamp'], unit='s')
         
         # Ensure numeric types
-        numeric_columns = ['temp', 'feels_like', 'humidity', 'pressure', 
-                          'wind_speed', 'clouds', 'rain', 'snow']
-        
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        for col, dtype in FORECAST_DTYPES.items():
+            if col in columns:
+                # Coerce, fill missing values and cast in one pass over the raw buffer
+                df[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=dtype, na_value=0)
+            elif col in _FORECAST_REQUIRED_COLUMNS:
+                # Ensure all expected columns exist
+                df[col] = np.zeros(len(df), dtype=dtype)
         
         return df
     
@@ -61,43 +125,31 @@ class DataProcessor:
             return pd.DataFrame()
         
         # Convert to DataFrame
-        df = pd.DataFrame(historical_data)
-        
-        # Ensure all expected columns exist
-        expected_columns = [
-            'temp_min', 'temp_max', 'temp_avg', 
-            'humidity', 'clouds', 'wind_speed',
-            'rain_sum', 'snow_sum', 'humidity_avg'
-        ]
-        
-        for col in expected_columns:
-            if col not in df.columns:
-                df[col] = 0
-        
-        # Fill missing values
-        df = df.fillna(0)
-        
-        # Format date columns
-        if 'timestamp' in df.columns and 'date' not in df.columns:
-            df['date'] = pd.to_datetime(df['timestamp'], unit='s').dt.date
-        
-        if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
-            df['date'] = pd.to_datetime(df['date'])
-        
-        # Ensure numeric types
-        numeric_columns = ['temp_min', 'temp_max', 'temp_avg', 
-                          'humidity', 'clouds', 'wind_speed',
-                          'rain_sum', 'snow_sum', 'humidity_avg']
-        
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        df = pd.DataFrame.from_records(historical_data)
+        columns = frozenset(df.columns)
+        
+        # Ensure all expected columns exist with numeric types
+        for col, dtype in HISTORICAL_DTYPES.items():
+            if col in columns:
+                # Coerce, fill missing values and cast in one pass over the raw buffer
+                df[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=dtype, na_value=0)
+            else:
+                df[col] = np.zeros(len(df), dtype=dtype)
+        
+        # Format date columns, truncating timestamps to whole days without
+        # a round trip through Python date objects
+        if 'timestamp' in columns and 'date' not in columns:
+            df['date'] = pd.to_datetime(df['timestamp'], unit='s').dt.floor('D')
+        elif 'date' in columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
+            df['date'] = pd.to_datetime(df['date'], cache=True)
         
         # Handle duplicate dates before setting as index
         # If there are duplicate dates, keep the first occurrence
-        if df['date'].duplicated().any():
+        date_ordinals = df['date'].to_numpy().astype('datetime64[ns]').view('i8')
+        _, first_idx = np.unique(date_ordinals, return_index=True)
+        if len(first_idx) != len(df):
             print("Found duplicate dates in historical data, keeping the first occurrence of each date")
-            df = df.drop_duplicates(subset=['date'], keep='first')
+            df = df.iloc[np.sort(first_idx)]
             
         # Set date as index for time series analysis
         df = df.set_index('date', drop=False)
@@ -117,68 +169,67 @@ class DataProcessor:
         if historical_df.empty:
             return {}
         
-        # Reset index if date is the index
-        if isinstance(historical_df.index, pd.DatetimeIndex):
-            df = historical_df.reset_index()
+        # Read columns directly from the source frame instead of copying it
+        if 'date' in historical_df.columns:
+            dates = historical_df['date']
         else:
-            df = historical_df.copy()
+            dates = historical_df.index.to_series()
         
         # Ensure date column is datetime
-        if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
-            df['date'] = pd.to_datetime(df['date'])
-        
-        # Extract month and season
-        df['month'] = df['date'].dt.month
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
         
         # Define seasons based on meteorological definition (Northern Hemisphere)
-        # Adjust for Southern Hemisphere if needed
-        df['season'] = 'Unknown'
-        df.loc[df['month'].isin([12, 1, 2]), 'season'] = 'Winter'
-        df.loc[df['month'].isin([3, 4, 5]), 'season'] = 'Spring'
-        df.loc[df['month'].isin([6, 7, 8]), 'season'] = 'Summer'
-        df.loc[df['month'].isin([9, 10, 11]), 'season'] = 'Fall'
+        # Adjust for Southern Hemisphere if needed (missing dates map to Unknown)
+        seasons = pd.Categorical.from_codes(_SEASON_LUT[dates.dt.month.fillna(0).to_numpy(dtype=np.intp)],
+                                            categories=_SEASON_NAMES)
         
         # Calculate indicators
         indicators = {}
         
-        # Temperature indicators
-        indicators['avg_annual_temp'] = df['temp_avg'].mean()
-        indicators['temp_range'] = df['temp_max'].max() - df['temp_min'].min()
+        # Extract the raw column buffers once for the vectorized reductions below
+        # (float64 matches HISTORICAL_DTYPES, so processed frames are not copied)
+        temp_avg = historical_df['temp_avg'].to_numpy(dtype=np.float64, copy=False)
+        temp_min = historical_df['temp_min'].to_numpy(dtype=np.float64, copy=False)
+        temp_max = historical_df['temp_max'].to_numpy(dtype=np.float64, copy=False)
+        rain_sum = historical_df['rain_sum'].to_numpy(dtype=np.float64, copy=False)
+        
+        # Temperature indicators (returned as Python floats, like growing_degree_days below)
+        indicators['avg_annual_temp'] = float(temp_avg.mean())
+        indicators['temp_range'] = float(temp_max.max()) - float(temp_min.min())
         
         # Calculate growing degree days (base 10°C)
-        df['gdd'] = df.apply(lambda x: max(0, x['temp_avg'] - 10), axis=1)
-        indicators['growing_degree_days'] = df['gdd'].sum()
+        indicators['growing_degree_days'] = float(np.maximum(temp_avg - 10.0, 0.0).sum())
         
         # Precipitation indicators
-        indicators['total_annual_rainfall'] = df['rain_sum'].sum()
-        indicators['rainy_days'] = (df['rain_sum'] > 0).sum()
-        indicators['heavy_rain_days'] = (df['rain_sum'] > 20).sum()
+        indicators['total_annual_rainfall'] = float(rain_sum.sum())
+        indicators['rainy_days'] = int(np.count_nonzero(rain_sum > 0))
+        indicators['heavy_rain_days'] = int(np.count_nonzero(rain_sum > 20))
         
         # Frost indicators
-        indicators['frost_days'] = (df['temp_min'] < 0).sum()
+        indicators['frost_days'] = int(np.count_nonzero(temp_min < 0))
         
         # Heat stress indicators
-        indicators['heat_stress_days'] = (df['temp_max'] > 30).sum()
+        indicators['heat_stress_days'] = int(np.count_nonzero(temp_max > 30))
         
         # Seasonal aggregations
-        season_agg = df.groupby('season').agg({
-            'temp_avg': 'mean',
-            'rain_sum': 'sum',
-            'humidity_avg': 'mean',
-            'wind_speed': 'mean'
-        })
+        season_agg = historical_df[['temp_avg', 'rain_sum']].groupby(seasons, observed=True, sort=False).agg(
+            avg_temp=('temp_avg', 'mean'),
+            total_rain=('rain_sum', 'sum')
+        )
         
-        for season in season_agg.index:
-            indicators[f'{season.lower()}_avg_temp'] = season_agg.loc[season, 'temp_avg']
-            indicators[f'{season.lower()}_total_rain'] = season_agg.loc[season, 'rain_sum']
+        for season, avg_temp, total_rain in zip(season_agg.index,
+                                                season_agg['avg_temp'].to_numpy(),
+                                                season_agg['total_rain'].to_numpy()):
+            indicators[f'{season.lower()}_avg_temp'] = float(avg_temp)
+            indicators[f'{season.lower()}_total_rain'] = float(total_rain)
         
         # Drought indicators
-        df['dry_spell'] = (df['rain_sum'] < 1).astype(int)
-        df['dry_spell_group'] = (df['dry_spell'].diff() != 0).cumsum()
-        dry_spells = df[df['dry_spell'] == 1].groupby('dry_spell_group').size()
+        dry_starts, dry_ends = _find_runs(rain_sum < 1)
+        dry_spells = dry_ends - dry_starts
         
-        indicators['max_dry_spell'] = dry_spells.max() if not dry_spells.empty else 0
-        indicators['dry_spells_5d_plus'] = (dry_spells >= 5).sum() if not dry_spells.empty else 0
+        indicators['max_dry_spell'] = int(dry_spells.max()) if dry_spells.size else 0
+        indicators['dry_spells_5d_plus'] = int(np.count_nonzero(dry_spells >= 5))
         
         return indicators
     
@@ -203,82 +254,77 @@ class DataProcessor:
         extreme_cold_threshold = -5  # °C
         drought_threshold = 15  # days without significant rain
         
+        # Raw buffers used to group consecutive days without intermediate columns
+        dates = historical_df['date']
+        date_values = dates.to_numpy()
+        day_ordinals = date_values.astype('datetime64[D]').view('i8')
+        temp_max = historical_df['temp_max'].to_numpy()
+        temp_min = historical_df['temp_min'].to_numpy()
+        rain_sum = historical_df['rain_sum'].to_numpy()
+        
         # Heat waves (3+ consecutive days with temp > threshold)
-        heat_days = historical_df[historical_df['temp_max'] > extreme_heat_threshold]
-        if not heat_days.empty:
-            # Group consecutive days
-            heat_days['date_diff'] = heat_days['date'].diff().dt.days
-            heat_days['group'] = (heat_days['date_diff'] > 1).cumsum()
-            heat_waves = heat_days.groupby('group').filter(lambda x: len(x) >= 3)
+        for wave in _consecutive_day_groups(day_ordinals, temp_max > extreme_heat_threshold, 3):
+            start_date = dates.iloc[wave].min()
+            end_date = dates.iloc[wave].max()
+            max_temp = float(temp_max[wave].max())
+            days = len(wave)
             
-            if not heat_waves.empty:
-                for group, wave in heat_waves.groupby('group'):
-                    start_date = wave['date'].min()
-                    end_date = wave['date'].max()
-                    max_temp = wave['temp_max'].max()
-                    days = len(wave)
-                    
-                    events.append({
-                        'type': 'Heat Wave',
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'duration': days,
-                        'max_value': max_temp,
-                        'description': f"Heat wave with temperatures up to {max_temp:.1f}°C for {days} days"
-                    })
+            events.append({
+                'type': 'Heat Wave',
+                'start_date': start_date,
+                'end_date': end_date,
+                'duration': days,
+                'max_value': max_temp,
+                'description': f"Heat wave with temperatures up to {max_temp:.1f}°C for {days} days"
+            })
         
         # Extreme rainfall events
-        extreme_rain = historical_df[historical_df['rain_sum'] > extreme_rain_threshold]
-        for _, row in extreme_rain.iterrows():
+        heavy_rain_positions = np.flatnonzero(rain_sum > extreme_rain_threshold)
+        for date, rain in zip(dates.iloc[heavy_rain_positions], rain_sum[heavy_rain_positions]):
+            rain = float(rain)
             events.append({
                 'type': 'Heavy Rainfall',
-                'start_date': row['date'],
-                'end_date': row['date'],
+                'start_date': date,
+                'end_date': date,
                 'duration': 1,
-                'max_value': row['rain_sum'],
-                'description': f"Heavy rainfall of {row['rain_sum']:.1f}mm"
+                'max_value': rain,
+                'description': f"Heavy rainfall of {rain:.1f}mm"
             })
         
         # Cold snaps
-        cold_days = historical_df[historical_df['temp_min'] < extreme_cold_threshold]
-        if not cold_days.empty:
-            # Group consecutive days
-            cold_days['date_diff'] = cold_days['date'].diff().dt.days
-            cold_days['group'] = (cold_days['date_diff'] > 1).cumsum()
-            cold_snaps = cold_days.groupby('group').filter(lambda x: len(x) >= 2)
+        for snap in _consecutive_day_groups(day_ordinals, temp_min < extreme_cold_threshold, 2):
+            start_date = dates.iloc[snap].min()
+            end_date = dates.iloc[snap].max()
+            min_temp = float(temp_min[snap].min())
+            days = len(snap)
             
-            if not cold_snaps.empty:
-                for group, snap in cold_snaps.groupby('group'):
-                    start_date = snap['date'].min()
-                    end_date = snap['date'].max()
-                    min_temp = snap['temp_min'].min()
-                    days = len(snap)
-                    
-                    events.append({
-                        'type': 'Cold Snap',
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'duration': days,
-                        'max_value': min_temp,
-                        'description': f"Cold snap with temperatures down to {min_temp:.1f}°C for {days} days"
-                    })
+            events.append({
+                'type': 'Cold Snap',
+                'start_date': start_date,
+                'end_date': end_date,
+                'duration': days,
+                'max_value': min_temp,
+                'description': f"Cold snap with temperatures down to {min_temp:.1f}°C for {days} days"
+            })
         
         # Drought periods
-        # Create a rolling window to find periods without significant rain
-        historical_df['significant_rain'] = historical_df['rain_sum'] >= 1
-        historical_df['days_without_rain'] = (~historical_df['significant_rain']).rolling(window=drought_threshold, min_periods=1).sum()
-        
-        drought_periods = historical_df[historical_df['days_without_rain'] >= drought_threshold]
-        if not drought_periods.empty:
-            # Group by month to avoid multiple drought events in the same period
-            drought_periods['month_year'] = drought_periods['date'].dt.to_period('M')
-            unique_droughts = drought_periods.groupby('month_year').first().reset_index()
+        # Count dry days in every trailing window to find periods without significant rain
+        dry_days = ~(rain_sum >= 1)
+        dry_count = np.concatenate(([0], np.cumsum(dry_days)))
+        window_dry_days = dry_count[drought_threshold:] - dry_count[:-drought_threshold]
+        drought_positions = np.flatnonzero(window_dry_days >= drought_threshold) + drought_threshold - 1
+        
+        if drought_positions.size:
+            # Keep the first drought day of each month to avoid multiple events in the same period
+            drought_months = date_values[drought_positions].astype('datetime64[M]')
+            _, first_in_month = np.unique(drought_months, return_index=True)
             
-            for _, row in unique_droughts.iterrows():
+            for position in drought_positions[first_in_month]:
+                end_date = dates.iloc[position]
                 events.append({
                     'type': 'Drought',
-                    'start_date': row['date'] - pd.Timedelta(days=drought_threshold),
-                    'end_date': row['date'],
+                    'start_date': end_date - pd.Timedelta(days=drought_threshold),
+                    'end_date': end_date,
                     'duration': drought_threshold,
                     'max_value': drought_threshold,
                     'description': f"Drought period of {drought_threshold}+ days without significant rainfall"
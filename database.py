@@ -1,8 +1,13 @@
 import os
+import functools
+import threading
+import time
+import numpy as np
 import sqlalchemy as sa
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, REAL, DateTime, Boolean, ForeignKey, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, selectinload, raiseload
+from sqlalchemy.dialects import postgresql, sqlite
 import datetime
 
 # Create SQLAlchemy base
@@ -16,23 +21,32 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     name = Column(String(255), nullable=True)
     email = Column(String(255), nullable=True, unique=True)
-    locations = relationship("SavedLocation", back_populates="user", cascade="all, delete-orphan")
-    crop_preferences = relationship("CropPreference", back_populates="user", cascade="all, delete-orphan")
+    # Small per-user collections; load them in one batched SELECT each
+    locations = relationship("SavedLocation", back_populates="user", cascade="all, delete-orphan", lazy='selectin')
+    crop_preferences = relationship("CropPreference", back_populates="user", cascade="all, delete-orphan", lazy='selectin')
+    soil_sensors = relationship("SoilMoistureSensor", back_populates="user", lazy='selectin')
 
 class SavedLocation(Base):
     __tablename__ = 'saved_locations'
+    __table_args__ = (
+        sa.Index('ix_saved_loc_user', 'user_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     user_id = Column(Integer, ForeignKey('users.id'))
     name = Column(String(255))
-    latitude = Column(Float)
-    longitude = Column(Float)
+    latitude = Column(REAL)  # 4-byte floats give ~1m precision, plenty for a field
+    longitude = Column(REAL)
     is_default = Column(Boolean, default=False)
     user = relationship("User", back_populates="locations")
 
 class CropPreference(Base):
     __tablename__ = 'crop_preferences'
+    __table_args__ = (
+        # Unique so save_crop_preference can upsert with ON CONFLICT
+        sa.Index('ix_crop_pref_user_name', 'user_id', 'crop_name', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -44,16 +58,22 @@ class CropPreference(Base):
 
 class WeatherRecord(Base):
     __tablename__ = 'weather_records'
+    __table_args__ = (
+        # Serves the bucket + time window lookup in get_weather_history
+        sa.Index('ix_weather_bucket_time', 'geo_bucket', 'recorded_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     recorded_at = Column(DateTime, default=datetime.datetime.utcnow)
-    latitude = Column(Float)
-    longitude = Column(Float)
+    latitude = Column(REAL)
+    longitude = Column(REAL)
     location_name = Column(String(255), nullable=True)
-    temperature = Column(Float)
-    humidity = Column(Float)
-    rainfall = Column(Float, nullable=True)
-    description = Column(String(255), nullable=True)
+    temperature = Column(REAL)
+    humidity = Column(REAL)
+    rainfall = Column(REAL, nullable=True)
+    description = Column(String(64), nullable=True)  # Short API condition text
+    # Coordinates quantized to a single 0.01° cell id (see _geo_bucket) for equality lookups
+    geo_bucket = Column(Integer)
 
 class SoilMoistureSensor(Base):
     __tablename__ = 'soil_moisture_sensors'
@@ -68,14 +88,20 @@ class SoilMoistureSensor(Base):
     field_area = Column(String(255), nullable=True)
     depth = Column(Float, nullable=True)  # Depth in cm
     sensor_type = Column(String(255), nullable=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
     is_active = Column(Boolean, default=True)
     
-    user = relationship("User", backref="soil_sensors")
+    user = relationship("User", back_populates="soil_sensors")
+    # Readings can run to many thousands of rows, so they stay lazy; use
+    # selectinload(SoilMoistureSensor.readings) in queries that need them
     readings = relationship("SoilMoistureReading", back_populates="sensor", cascade="all, delete-orphan")
     
 class SoilMoistureReading(Base):
     __tablename__ = 'soil_moisture_readings'
+    __table_args__ = (
+        # Serves the per-sensor time window scan in get_soil_moisture_readings
+        sa.Index('ix_smr_sensor_time', 'sensor_id', 'recorded_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     recorded_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -88,59 +114,314 @@ class SoilMoistureReading(Base):
     
     sensor = relationship("SoilMoistureSensor", back_populates="readings")
 
+def _coordinate_cell(coordinate):
+    """Quantize a latitude or longitude to its 0.01 degree cell"""
+    return int(round(coordinate * 100))
+
+def _geo_bucket(lat_cell, lon_cell):
+    """Combine latitude and longitude cells into one integer bucket id"""
+    # Longitude cells lie within +/-18000, so the two halves never collide
+    return lat_cell * 100000 + lon_cell
+
+# Columns returned by the saved-location helpers
+_LOCATION_COLUMNS = (
+    SavedLocation.id,
+    SavedLocation.name,
+    SavedLocation.latitude,
+    SavedLocation.longitude,
+    SavedLocation.is_default
+)
+
+# Columns returned by the soil moisture sensor helpers
+_SENSOR_COLUMNS = (
+    SoilMoistureSensor.id,
+    SoilMoistureSensor.name,
+    SoilMoistureSensor.sensor_id,
+    SoilMoistureSensor.location_name,
+    SoilMoistureSensor.latitude,
+    SoilMoistureSensor.longitude,
+    SoilMoistureSensor.field_area,
+    SoilMoistureSensor.depth,
+    SoilMoistureSensor.sensor_type,
+    SoilMoistureSensor.is_active
+)
+
+# Columns returned by the soil moisture reading helpers
+_READING_COLUMNS = (
+    SoilMoistureReading.id,
+    SoilMoistureReading.recorded_at,
+    SoilMoistureReading.sensor_id,
+    SoilMoistureReading.moisture_percentage,
+    SoilMoistureReading.temperature,
+    SoilMoistureReading.electrical_conductivity,
+    SoilMoistureReading.battery_level,
+    SoilMoistureReading.signal_strength
+)
+
+# Hot read queries, built once as lambda statements so each call only binds
+# parameters instead of rebuilding and re-keying the expression tree
+_WEATHER_HISTORY_STMT = sa.lambda_stmt(
+    lambda: sa.select(
+        WeatherRecord.id,
+        WeatherRecord.recorded_at,
+        WeatherRecord.latitude,
+        WeatherRecord.longitude,
+        WeatherRecord.location_name,
+        WeatherRecord.temperature,
+        WeatherRecord.humidity,
+        WeatherRecord.rainfall,
+        WeatherRecord.description
+    ).where(
+        WeatherRecord.geo_bucket.in_(sa.bindparam('buckets', expanding=True)),
+        WeatherRecord.latitude.between(sa.bindparam('lat_min'), sa.bindparam('lat_max')),
+        WeatherRecord.longitude.between(sa.bindparam('lon_min'), sa.bindparam('lon_max')),
+        WeatherRecord.recorded_at >= sa.bindparam('cutoff_date')
+    ).order_by(WeatherRecord.recorded_at.desc())
+)
+
+_READINGS_STMT = sa.lambda_stmt(
+    lambda: sa.select(*_READING_COLUMNS).where(
+        SoilMoistureReading.sensor_id == sa.bindparam('sensor_id'),
+        SoilMoistureReading.recorded_at >= sa.bindparam('cutoff_date')
+    ).order_by(SoilMoistureReading.recorded_at.asc())
+)
+
+_READINGS_COUNT_STMT = sa.lambda_stmt(
+    lambda: sa.select(sa.func.count()).select_from(SoilMoistureReading).where(
+        SoilMoistureReading.sensor_id == sa.bindparam('sensor_id'),
+        SoilMoistureReading.recorded_at >= sa.bindparam('cutoff_date')
+    )
+)
+
+# Measurement columns averaged when readings are downsampled; they follow
+# id, recorded_at and sensor_id in _READING_COLUMNS
+_READING_VALUE_KEYS = (
+    'moisture_percentage',
+    'temperature',
+    'electrical_conductivity',
+    'battery_level',
+    'signal_strength'
+)
+
+# INSERT constructs supporting ON CONFLICT, keyed by dialect name
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+def _upsert_insert(session, model):
+    """Get an ON CONFLICT capable INSERT for the session's dialect, or None"""
+    insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    return insert(model) if insert else None
+
+# Set DB_STRICT_LOAD to make any unplanned lazy load raise instead of querying
+_STRICT_LOAD = bool(os.getenv("DB_STRICT_LOAD"))
+
+def _strict_options(*eager):
+    """Eager-load the given relationships, forbidding other lazy loads in strict mode"""
+    options = [selectinload(relationship) for relationship in eager]
+    if _STRICT_LOAD:
+        options.append(raiseload('*'))
+    return options
+
+def _strict_load(query, *eager):
+    """Apply _strict_options to a query"""
+    options = _strict_options(*eager)
+    return query.options(*options) if options else query
+
+# Sentinel returned by _TTLCache.get for absent keys, so None can be cached
+_MISSING = object()
+
+class _TTLCache:
+    """Small thread-safe cache whose entries expire after a fixed number of seconds"""
+    
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=_MISSING):
+        """Return the cached value for key, or default if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            return entry[1]
+    
+    def put(self, key, value):
+        """Cache value for key, evicting the oldest entry when full"""
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.maxsize:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+    
+    def pop(self, key):
+        """Drop any cached value for key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+# Short-lived caches for lookups made on every UI interaction; the write
+# helpers invalidate the affected keys after committing
+_default_location_cache = _TTLCache(maxsize=1024, ttl=30)
+_sensor_cache = _TTLCache(maxsize=2048, ttl=30)
+
+# Session factory shared by all helpers; bound to the cached engine per session
+_SessionFactory = sessionmaker(expire_on_commit=False)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection for concurrent reads during writes"""
+    # WAL lets the UI read while the simulator writes; with WAL, NORMAL sync
+    # only fsyncs at checkpoints and still cannot corrupt the database
+    cursor = dbapi_connection.cursor()
+    cursor.executescript(
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA mmap_size=134217728;"
+    )
+    cursor.close()
+
 # Database connection setup
+@functools.lru_cache(maxsize=1)
 def get_engine():
-    """Get database engine using environment variables"""
+    """Get the shared database engine using environment variables"""
     db_url = os.getenv("DATABASE_URL")
     if not db_url:
         # Fallback for local development
         db_url = "sqlite:///farmweather.db"
-    return create_engine(db_url)
+    # Size the pool for the UI plus the sensor simulation thread; pre-ping and
+    # recycle so pooled connections survive server-side idle timeouts
+    engine = create_engine(
+        db_url,
+        pool_size=20,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=1800
+    )
+    if engine.dialect.name == 'sqlite':
+        sa.event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
 
-def init_db():
-    """Initialize database with tables"""
+def _backfill_geo_buckets(conn):
+    """Fill in geo_bucket for weather rows written before the column existed"""
+    rows = conn.execute(
+        sa.select(WeatherRecord.id, WeatherRecord.latitude, WeatherRecord.longitude).where(
+            WeatherRecord.geo_bucket.is_(None),
+            WeatherRecord.latitude.isnot(None),
+            WeatherRecord.longitude.isnot(None)
+        )
+    ).all()
+    if not rows:
+        return
+    
+    # Computed in Python with the same rounding record_weather uses
+    conn.execute(
+        sa.update(WeatherRecord.__table__)
+        .where(WeatherRecord.__table__.c.id == sa.bindparam('row_id'))
+        .values(geo_bucket=sa.bindparam('bucket')),
+        [
+            {
+                'row_id': row.id,
+                'bucket': _geo_bucket(_coordinate_cell(row.latitude), _coordinate_cell(row.longitude))
+            }
+            for row in rows
+        ]
+    )
+
+def _sync_indexes(conn):
+    """Create declared indexes missing from existing tables, rebuilding changed ones"""
+    inspector = sa.inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {index['name']: index for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            found = existing.get(index.name)
+            if found is not None:
+                if (found['column_names'] == [column.name for column in index.columns]
+                        and bool(found['unique']) == bool(index.unique)):
+                    continue
+                index.drop(conn)
+            index.create(conn)
+
+def _migrate_schema(conn):
+    """
+    Bring tables created by earlier versions in line with the models
+    
+    create_all only creates missing tables, so columns and indexes added to
+    existing tables are handled here.
+    """
+    # geo_bucket replaced the lat/lon range index for weather history lookups
+    weather_columns = {column['name'] for column in sa.inspect(conn).get_columns('weather_records')}
+    if 'geo_bucket' not in weather_columns:
+        conn.execute(sa.text("ALTER TABLE weather_records ADD COLUMN geo_bucket INTEGER"))
+    conn.execute(sa.text("DROP INDEX IF EXISTS ix_weather_latlon_time"))
+    _backfill_geo_buckets(conn)
+    
+    # save_crop_preference upserts against a unique (user_id, crop_name)
+    # index; keep the newest of any duplicate rows so the index can be built
+    crop_indexes = {index['name']: index for index in sa.inspect(conn).get_indexes('crop_preferences')}
+    if not crop_indexes.get('ix_crop_pref_user_name', {}).get('unique'):
+        newest_ids = sa.select(sa.func.max(CropPreference.id)).group_by(
+            CropPreference.user_id, CropPreference.crop_name
+        )
+        conn.execute(sa.delete(CropPreference).where(CropPreference.id.not_in(newest_ids)))
+    
+    _sync_indexes(conn)
+
+@functools.lru_cache(maxsize=1)
+def ensure_schema():
+    """
+    Create any missing tables and migrate existing ones (runs once per process)
+    
+    Nothing touches the database at import time; call this from the app
+    entrypoint before the first query.
+    """
     engine = get_engine()
     Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        _migrate_schema(conn)
     return engine
 
 def get_session():
-    """Create a new database session"""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """
+    Create a new database session
+    
+    Use as a context manager, adding session.begin() for writes so the
+    transaction commits (or rolls back) and the session closes on exit.
+    """
+    return _SessionFactory(bind=get_engine())
 
 # User management functions
 def get_or_create_user(email=None, name=None):
     """Get existing user or create a new one"""
-    session = get_session()
-    
-    try:
+    with get_session() as session, session.begin():
         if email:
-            user = session.query(User).filter_by(email=email).first()
-            if user:
-                # Make a copy of the id before returning
-                user_id = user.id
+            # Only the id is needed, so skip loading the user and its collections
+            user_id = session.execute(
+                sa.select(User.id).where(User.email == email)
+            ).scalar()
+            if user_id is not None:
                 return {'id': user_id, 'email': email, 'name': name}
         
         # Create new user
         user = User(email=email, name=name)
         session.add(user)
-        session.commit()
+        session.flush()
         
         # Get the id and return a dictionary instead of the ORM object
         user_id = user.id
         return {'id': user_id, 'email': email, 'name': name}
-    finally:
-        session.close()
 
 def save_location(user_id, name, latitude, longitude, is_default=False):
     """Save a location for a user"""
-    session = get_session()
-    
-    try:
+    with get_session() as session, session.begin():
         # If this is the new default, unset any existing defaults
         if is_default:
-            existing_defaults = session.query(SavedLocation).filter_by(
+            existing_defaults = _strict_load(session.query(SavedLocation)).filter_by(
                 user_id=user_id, is_default=True
             ).all()
             for loc in existing_defaults:
@@ -154,7 +435,7 @@ def save_location(user_id, name, latitude, longitude, is_default=False):
             is_default=is_default
         )
         session.add(location)
-        session.commit()
+        session.flush()
         
         # Create a dictionary with the location data to return
         location_data = {
@@ -164,56 +445,82 @@ def save_location(user_id, name, latitude, longitude, is_default=False):
             'longitude': location.longitude,
             'is_default': location.is_default
         }
-        return location_data
-    finally:
-        session.close()
+    
+    _default_location_cache.pop(user_id)
+    return location_data
+
+def save_locations_bulk(user_id, rows):
+    """Save several locations for a user in a single round-trip"""
+    if not rows:
+        return 0
+    
+    with get_session() as session, session.begin():
+        locations = [{'user_id': user_id, 'is_default': False, **row} for row in rows]
+        
+        # Only the last default in the batch is kept, as with repeated save_location calls
+        default_positions = [i for i, loc in enumerate(locations) if loc['is_default']]
+        if default_positions:
+            session.query(SavedLocation).filter_by(
+                user_id=user_id, is_default=True
+            ).update({'is_default': False})
+            for i, loc in enumerate(locations):
+                loc['is_default'] = i == default_positions[-1]
+        
+        session.execute(sa.insert(SavedLocation), locations)
+    
+    _default_location_cache.pop(user_id)
+    return len(locations)
 
 def get_saved_locations(user_id):
     """Get all saved locations for a user"""
-    session = get_session()
-    try:
-        locations = session.query(SavedLocation).filter_by(user_id=user_id).all()
-        # Convert to list of dictionaries to avoid session issues
-        return [
-            {
-                'id': loc.id,
-                'name': loc.name,
-                'latitude': loc.latitude,
-                'longitude': loc.longitude,
-                'is_default': loc.is_default
-            } 
-            for loc in locations
-        ]
-    finally:
-        session.close()
+    with get_session() as session:
+        # Select only the needed columns to skip ORM object construction
+        rows = session.execute(
+            sa.select(*_LOCATION_COLUMNS).where(SavedLocation.user_id == user_id)
+        ).mappings().all()
+        return [dict(row) for row in rows]
 
 def get_default_location(user_id):
     """Get the default location for a user, if any"""
-    session = get_session()
-    try:
-        location = session.query(SavedLocation).filter_by(
-            user_id=user_id, is_default=True
-        ).first()
+    location = _default_location_cache.get(user_id)
+    if location is _MISSING:
+        with get_session() as session:
+            row = session.execute(
+                sa.select(*_LOCATION_COLUMNS).where(
+                    SavedLocation.user_id == user_id,
+                    SavedLocation.is_default == True
+                ).limit(1)
+            ).mappings().first()
         
-        if location:
-            return {
-                'id': location.id,
-                'name': location.name,
-                'latitude': location.latitude,
-                'longitude': location.longitude,
-                'is_default': location.is_default
-            }
-        return None
-    finally:
-        session.close()
+        location = dict(row) if row else None
+        _default_location_cache.put(user_id, location)
+    
+    # Hand out a copy so callers can't modify the cached entry
+    if location:
+        return dict(location)
+    return None
 
 def save_crop_preference(user_id, crop_name, is_favorite=True, notes=None):
     """Save a crop preference for a user"""
-    session = get_session()
-    
-    try:
+    with get_session() as session, session.begin():
+        stmt = _upsert_insert(session, CropPreference)
+        if stmt is not None:
+            # Insert or update in one statement
+            session.execute(
+                stmt.values(
+                    user_id=user_id,
+                    crop_name=crop_name,
+                    is_favorite=is_favorite,
+                    notes=notes
+                ).on_conflict_do_update(
+                    index_elements=['user_id', 'crop_name'],
+                    set_={'is_favorite': is_favorite, 'notes': notes}
+                )
+            )
+            return True
+        
         # Check if preference already exists
-        existing = session.query(CropPreference).filter_by(
+        existing = _strict_load(session.query(CropPreference)).filter_by(
             user_id=user_id, crop_name=crop_name
         ).first()
         
@@ -229,33 +536,58 @@ def save_crop_preference(user_id, crop_name, is_favorite=True, notes=None):
             )
             session.add(preference)
         
-        session.commit()
         return True
-    finally:
-        session.close()
+
+def save_crop_preferences_bulk(user_id, preferences):
+    """Save several crop preferences for a user in a single transaction"""
+    if not preferences:
+        return True
+    
+    with get_session() as session, session.begin():
+        # Later entries for the same crop override earlier ones
+        by_crop = {pref['crop_name']: pref for pref in preferences}
+        existing_ids = dict(
+            session.query(CropPreference.crop_name, CropPreference.id).filter(
+                CropPreference.user_id == user_id,
+                CropPreference.crop_name.in_(list(by_crop))
+            ).all()
+        )
+        
+        updates = []
+        inserts = []
+        for crop_name, pref in by_crop.items():
+            values = {
+                'is_favorite': pref.get('is_favorite', True),
+                'notes': pref.get('notes')
+            }
+            if crop_name in existing_ids:
+                updates.append({'id': existing_ids[crop_name], **values})
+            else:
+                inserts.append({'user_id': user_id, 'crop_name': crop_name, **values})
+        
+        if updates:
+            session.execute(sa.update(CropPreference), updates)
+        if inserts:
+            session.execute(sa.insert(CropPreference), inserts)
+        
+        return True
 
 def get_crop_preferences(user_id):
     """Get all crop preferences for a user"""
-    session = get_session()
-    try:
-        preferences = session.query(CropPreference).filter_by(user_id=user_id).all()
-        # Convert to list of dictionaries to avoid session issues
-        return [
-            {
-                'id': pref.id,
-                'crop_name': pref.crop_name,
-                'is_favorite': pref.is_favorite,
-                'notes': pref.notes
-            } 
-            for pref in preferences
-        ]
-    finally:
-        session.close()
+    with get_session() as session:
+        rows = session.execute(
+            sa.select(
+                CropPreference.id,
+                CropPreference.crop_name,
+                CropPreference.is_favorite,
+                CropPreference.notes
+            ).where(CropPreference.user_id == user_id)
+        ).mappings().all()
+        return [dict(row) for row in rows]
 
 def record_weather(latitude, longitude, location_name, temperature, humidity, rainfall=None, description=None):
     """Record weather data for historical analysis"""
-    session = get_session()
-    try:
+    with get_session() as session, session.begin():
         record = WeatherRecord(
             latitude=latitude,
             longitude=longitude,
@@ -263,10 +595,11 @@ def record_weather(latitude, longitude, location_name, temperature, humidity, ra
             temperature=temperature,
             humidity=humidity,
             rainfall=rainfall,
-            description=description
+            description=description,
+            geo_bucket=_geo_bucket(_coordinate_cell(latitude), _coordinate_cell(longitude))
         )
         session.add(record)
-        session.commit()
+        session.flush()
         return {
             'id': record.id,
             'latitude': record.latitude,
@@ -274,138 +607,110 @@ def record_weather(latitude, longitude, location_name, temperature, humidity, ra
             'temperature': record.temperature,
             'humidity': record.humidity
         }
-    finally:
-        session.close()
 
 def get_weather_history(latitude, longitude, days=30):
     """Get weather history for a location"""
-    session = get_session()
-    try:
+    with get_session() as session:
         cutoff_date = datetime.datetime.utcnow() - datetime.timedelta(days=days)
         
         # Find records within 0.01 degree radius (approx 1km)
         lat_min, lat_max = latitude - 0.01, latitude + 0.01
         lon_min, lon_max = longitude - 0.01, longitude + 0.01
         
-        records = session.query(WeatherRecord).filter(
-            WeatherRecord.latitude.between(lat_min, lat_max),
-            WeatherRecord.longitude.between(lon_min, lon_max),
-            WeatherRecord.recorded_at >= cutoff_date
-        ).order_by(WeatherRecord.recorded_at.desc()).all()
-        
-        # Convert to list of dictionaries to avoid session issues
-        return [
-            {
-                'id': rec.id,
-                'recorded_at': rec.recorded_at,
-                'latitude': rec.latitude,
-                'longitude': rec.longitude,
-                'location_name': rec.location_name,
-                'temperature': rec.temperature,
-                'humidity': rec.humidity,
-                'rainfall': rec.rainfall,
-                'description': rec.description
-            } 
-            for rec in records
+        # Buckets covering the box; the float range check is kept as a post-filter
+        buckets = [
+            _geo_bucket(lat_cell, lon_cell)
+            for lat_cell in range(_coordinate_cell(lat_min), _coordinate_cell(lat_max) + 1)
+            for lon_cell in range(_coordinate_cell(lon_min), _coordinate_cell(lon_max) + 1)
         ]
-    finally:
-        session.close()
+        
+        rows = session.execute(_WEATHER_HISTORY_STMT, {
+            'buckets': buckets,
+            'lat_min': lat_min,
+            'lat_max': lat_max,
+            'lon_min': lon_min,
+            'lon_max': lon_max,
+            'cutoff_date': cutoff_date
+        }).mappings().all()
+        
+        return [dict(row) for row in rows]
 
 # Soil moisture sensor functions
 def register_soil_moisture_sensor(user_id, name, sensor_id, location_name, latitude, longitude, 
                                 field_area=None, depth=None, sensor_type=None):
     """Register a new soil moisture sensor for a user"""
-    session = get_session()
+    values = {
+        'user_id': user_id,
+        'name': name,
+        'sensor_id': sensor_id,
+        'location_name': location_name,
+        'latitude': latitude,
+        'longitude': longitude,
+        'field_area': field_area,
+        'depth': depth,
+        'sensor_type': sensor_type,
+        'is_active': True
+    }
     
-    try:
-        # Check if sensor_id already exists
-        existing = session.query(SoilMoistureSensor).filter_by(sensor_id=sensor_id).first()
-        if existing:
-            return None  # Sensor ID must be unique
-        
-        sensor = SoilMoistureSensor(
-            user_id=user_id,
-            name=name,
-            sensor_id=sensor_id,
-            location_name=location_name,
-            latitude=latitude,
-            longitude=longitude,
-            field_area=field_area,
-            depth=depth,
-            sensor_type=sensor_type,
-            is_active=True
-        )
-        session.add(sensor)
-        session.commit()
-        
-        # Create a dictionary with the sensor data to return
-        sensor_data = {
-            'id': sensor.id,
-            'name': sensor.name,
-            'sensor_id': sensor.sensor_id,
-            'location_name': sensor.location_name,
-            'latitude': sensor.latitude,
-            'longitude': sensor.longitude,
-            'field_area': sensor.field_area,
-            'depth': sensor.depth,
-            'sensor_type': sensor.sensor_type,
-            'is_active': sensor.is_active
-        }
-        return sensor_data
-    finally:
-        session.close()
+    with get_session() as session, session.begin():
+        stmt = _upsert_insert(session, SoilMoistureSensor)
+        if stmt is not None:
+            # Insert and uniqueness check in one round-trip; no row back means
+            # the sensor ID was already taken
+            row = session.execute(
+                stmt.values(**values)
+                .on_conflict_do_nothing(index_elements=['sensor_id'])
+                .returning(*_SENSOR_COLUMNS)
+            ).mappings().first()
+            if not row:
+                return None
+            sensor_data = dict(row)
+        else:
+            # Check if sensor_id already exists
+            existing = _strict_load(session.query(SoilMoistureSensor)).filter_by(sensor_id=sensor_id).first()
+            if existing:
+                return None  # Sensor ID must be unique
+            
+            sensor = SoilMoistureSensor(**values)
+            session.add(sensor)
+            session.flush()
+            
+            # Create a dictionary with the sensor data to return
+            sensor_data = {column.key: getattr(sensor, column.key) for column in _SENSOR_COLUMNS}
+    
+    # Drop any cached miss for the new row's ID
+    _sensor_cache.pop(sensor_data['id'])
+    return sensor_data
 
 def get_soil_moisture_sensors(user_id):
     """Get all soil moisture sensors for a user"""
-    session = get_session()
-    try:
-        sensors = session.query(SoilMoistureSensor).filter_by(user_id=user_id).all()
-        # Convert to list of dictionaries to avoid session issues
-        return [
-            {
-                'id': sensor.id,
-                'name': sensor.name,
-                'sensor_id': sensor.sensor_id,
-                'location_name': sensor.location_name,
-                'latitude': sensor.latitude,
-                'longitude': sensor.longitude,
-                'field_area': sensor.field_area,
-                'depth': sensor.depth,
-                'sensor_type': sensor.sensor_type,
-                'is_active': sensor.is_active
-            } 
-            for sensor in sensors
-        ]
-    finally:
-        session.close()
+    with get_session() as session:
+        # Select only the needed columns to skip ORM object construction
+        rows = session.execute(
+            sa.select(*_SENSOR_COLUMNS).where(SoilMoistureSensor.user_id == user_id)
+        ).mappings().all()
+        return [dict(row) for row in rows]
 
 def get_soil_moisture_sensor(sensor_id):
     """Get a soil moisture sensor by ID"""
-    session = get_session()
-    try:
-        sensor = session.query(SoilMoistureSensor).filter_by(id=sensor_id).first()
-        if sensor:
-            return {
-                'id': sensor.id,
-                'name': sensor.name,
-                'sensor_id': sensor.sensor_id,
-                'location_name': sensor.location_name,
-                'latitude': sensor.latitude,
-                'longitude': sensor.longitude,
-                'field_area': sensor.field_area,
-                'depth': sensor.depth,
-                'sensor_type': sensor.sensor_type,
-                'is_active': sensor.is_active
-            }
-        return None
-    finally:
-        session.close()
+    sensor = _sensor_cache.get(sensor_id)
+    if sensor is _MISSING:
+        with get_session() as session:
+            row = session.execute(
+                sa.select(*_SENSOR_COLUMNS).where(SoilMoistureSensor.id == sensor_id)
+            ).mappings().first()
+        
+        sensor = dict(row) if row else None
+        _sensor_cache.put(sensor_id, sensor)
+    
+    if sensor:
+        return dict(sensor)
+    return None
 
 def update_soil_moisture_sensor(sensor_id, **kwargs):
     """Update a soil moisture sensor"""
-    session = get_session()
-    try:
-        sensor = session.query(SoilMoistureSensor).filter_by(id=sensor_id).first()
+    with get_session() as session, session.begin():
+        sensor = session.get(SoilMoistureSensor, sensor_id, options=_strict_options())
         if not sensor:
             return False
         
@@ -413,33 +718,32 @@ def update_soil_moisture_sensor(sensor_id, **kwargs):
         for key, value in kwargs.items():
             if hasattr(sensor, key):
                 setattr(sensor, key, value)
-        
-        session.commit()
-        return True
-    finally:
-        session.close()
+    
+    _sensor_cache.pop(sensor_id)
+    return True
 
 def delete_soil_moisture_sensor(sensor_id):
     """Delete a soil moisture sensor"""
-    session = get_session()
-    try:
-        sensor = session.query(SoilMoistureSensor).filter_by(id=sensor_id).first()
+    with get_session() as session, session.begin():
+        # Load the readings in one batch for the delete-orphan cascade
+        sensor = session.get(
+            SoilMoistureSensor, sensor_id,
+            options=_strict_options(SoilMoistureSensor.readings)
+        )
         if not sensor:
             return False
         
         session.delete(sensor)
-        session.commit()
-        return True
-    finally:
-        session.close()
+    
+    _sensor_cache.pop(sensor_id)
+    return True
 
 def record_soil_moisture_reading(sensor_id, moisture_percentage, temperature=None, 
                                electrical_conductivity=None, battery_level=None, signal_strength=None):
     """Record a new reading from a soil moisture sensor"""
-    session = get_session()
-    try:
+    with get_session() as session, session.begin():
         # Verify sensor exists
-        sensor = session.query(SoilMoistureSensor).filter_by(id=sensor_id).first()
+        sensor = session.get(SoilMoistureSensor, sensor_id, options=_strict_options())
         if not sensor:
             return None
         
@@ -452,7 +756,7 @@ def record_soil_moisture_reading(sensor_id, moisture_percentage, temperature=Non
             signal_strength=signal_strength
         )
         session.add(reading)
-        session.commit()
+        session.flush()
         
         return {
             'id': reading.id,
@@ -464,36 +768,86 @@ def record_soil_moisture_reading(sensor_id, moisture_percentage, temperature=Non
             'battery_level': reading.battery_level,
             'signal_strength': reading.signal_strength
         }
-    finally:
-        session.close()
 
-def get_soil_moisture_readings(sensor_id, days=7):
-    """Get soil moisture readings for a sensor over a specified time period"""
-    session = get_session()
-    try:
-        cutoff_date = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+def record_soil_moisture_readings_bulk(readings):
+    """Record several sensor readings in a single round-trip, returning their ids in order"""
+    if not readings:
+        return []
+    
+    with get_session() as session, session.begin():
+        # Batched into multi-row INSERT ... RETURNING statements (insertmanyvalues)
+        result = session.execute(
+            sa.insert(SoilMoistureReading).returning(
+                SoilMoistureReading.id, sort_by_parameter_order=True
+            ).execution_options(insertmanyvalues_page_size=500),
+            readings
+        )
+        return result.scalars().all()
+
+def _downsample_readings(result, total, max_points):
+    """
+    Average streamed reading rows into max_points equal-sized buckets
+    
+    Each bucket keeps the id and timestamp of its latest reading and the mean
+    of each measurement, ignoring missing values.
+    """
+    n_values = len(_READING_VALUE_KEYS)
+    sums = np.zeros((max_points, n_values))
+    counts = np.zeros((max_points, n_values))
+    latest = [None] * max_points
+    
+    position = 0
+    for partition in result.partitions():
+        size = len(partition)
+        # Rows added after the count land in the last bucket
+        buckets = np.minimum(
+            np.arange(position, position + size) * max_points // total,
+            max_points - 1
+        )
+        position += size
         
-        readings = session.query(SoilMoistureReading).filter(
-            SoilMoistureReading.sensor_id == sensor_id,
-            SoilMoistureReading.recorded_at >= cutoff_date
-        ).order_by(SoilMoistureReading.recorded_at.asc()).all()
+        values = np.array([row[3:] for row in partition], dtype=np.float64)
+        present = ~np.isnan(values)
+        np.add.at(sums, buckets, np.where(present, values, 0.0))
+        np.add.at(counts, buckets, present)
         
-        # Convert to list of dictionaries to avoid session issues
-        return [
-            {
-                'id': reading.id,
-                'recorded_at': reading.recorded_at,
-                'sensor_id': reading.sensor_id,
-                'moisture_percentage': reading.moisture_percentage,
-                'temperature': reading.temperature,
-                'electrical_conductivity': reading.electrical_conductivity,
-                'battery_level': reading.battery_level,
-                'signal_strength': reading.signal_strength
-            } 
-            for reading in readings
-        ]
-    finally:
-        session.close()
+        # Rows arrive in time order, so each bucket's last row is its latest
+        for index in np.flatnonzero(np.diff(buckets, append=-1)):
+            latest[buckets[index]] = partition[index]
+    
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+    
+    readings = []
+    for bucket, row in enumerate(latest):
+        if row is None:
+            continue
+        reading = {'id': row.id, 'recorded_at': row.recorded_at, 'sensor_id': row.sensor_id}
+        for key, mean, count in zip(_READING_VALUE_KEYS, means[bucket].tolist(), counts[bucket]):
+            reading[key] = mean if count else None
+        if reading['signal_strength'] is not None:
+            reading['signal_strength'] = int(round(reading['signal_strength']))
+        readings.append(reading)
+    return readings
 
-# Initialize database on import
-init_db()
\ No newline at end of file
+def get_soil_moisture_readings(sensor_id, days=7, max_points=2000):
+    """
+    Get soil moisture readings for a sensor over a specified time period
+    
+    Ranges with more than max_points readings are streamed from the database
+    and averaged down to max_points evenly spaced readings.
+    """
+    with get_session() as session:
+        cutoff_date = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+        params = {'sensor_id': sensor_id, 'cutoff_date': cutoff_date}
+        
+        total = session.execute(_READINGS_COUNT_STMT, params).scalar()
+        if total <= max_points:
+            rows = session.execute(_READINGS_STMT, params).mappings().all()
+            return [dict(row) for row in rows]
+        
+        # Stream in chunks so long ranges never sit in memory all at once
+        result = session.execute(
+            _READINGS_STMT, params, execution_options={'yield_per': 1000}
+        )
+        return _downsample_readings(result, total, max_points)
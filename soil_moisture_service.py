@@ -1,11 +1,58 @@
 import datetime
 import random
+from bisect import bisect_right
 import math
 import time
 import threading
-from queue import Queue
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import database as db
 
+# Simulated readings are written in batches of this many rows, or at least this often
+_FLUSH_ROWS = 20
+_FLUSH_SECONDS = 10.0
+
+# Seconds between simulation ticks; every sensor reports once per tick
+_TICK_SECONDS = 2.0
+
+# Readings kept for the UI between polls
+_BUFFER_SIZE = 1024
+
+# Per-tick moisture drift: declining, stable or rising
+_MOISTURE_TRENDS = np.array([-0.1, 0.0, 0.1])
+
+# Moisture status bands: readings below _MOISTURE_THRESHOLDS[i] fall in
+# _MOISTURE_BANDS[i], anything at or above the last threshold is saturated
+_MOISTURE_THRESHOLDS = (20, 35, 65, 80)
+_MOISTURE_BANDS = (
+    {
+        "status": "Critically Dry",
+        "condition": "danger",
+        "recommendation": "Immediate irrigation needed. Plants may be experiencing severe water stress."
+    },
+    {
+        "status": "Dry",
+        "condition": "warning",
+        "recommendation": "Schedule irrigation soon. Soil moisture approaching critical levels."
+    },
+    {
+        "status": "Optimal",
+        "condition": "good",
+        "recommendation": "Moisture levels ideal. Maintain current irrigation schedule."
+    },
+    {
+        "status": "Moist",
+        "condition": "moderate",
+        "recommendation": "Moisture adequate. Consider reducing irrigation frequency."
+    },
+    {
+        "status": "Saturated",
+        "condition": "danger",
+        "recommendation": "Soil over-saturated. Pause irrigation to prevent root rot and nutrient leaching."
+    }
+)
+
 class SoilMoistureService:
     """
     Service for managing soil moisture sensor data and simulating IoT devices
@@ -16,27 +63,62 @@ class SoilMoistureService:
         """Initialize the soil moisture service"""
         self.simulation_running = False
         self.simulation_thread = None
-        self.data_queue = Queue()
-        self.registered_callbacks = []
+        self._stop_event = threading.Event()
+        # Bounded buffer of readings for the UI; the oldest are dropped when full
+        self.data_buffer = deque(maxlen=_BUFFER_SIZE)
+        # Maps each callback to whether it takes a whole batch of readings
+        self.registered_callbacks = {}
+        self._pending_readings = []
+        self._pending_lock = threading.Lock()
+        self._valid_sensor_ids = set()
     
-    def register_callback(self, callback):
-        """Register a callback function to receive real-time data"""
+    def register_callback(self, callback, batch=False):
+        """
+        Register a callback function to receive real-time data
+        
+        Args:
+            callback (callable): Function to call with new readings
+            batch (bool): If True, call it once per tick with the list of readings;
+                otherwise call it once per reading (deprecated)
+        """
         if callback not in self.registered_callbacks:
-            self.registered_callbacks.append(callback)
+            self.registered_callbacks[callback] = batch
     
     def unregister_callback(self, callback):
         """Unregister a callback function"""
-        if callback in self.registered_callbacks:
-            self.registered_callbacks.remove(callback)
+        self.registered_callbacks.pop(callback, None)
     
-    def _notify_callbacks(self, data):
-        """Notify all registered callbacks with new data"""
-        for callback in self.registered_callbacks:
+    def _notify_callbacks(self, readings):
+        """Notify all registered callbacks with a batch of new readings"""
+        for callback, batch in list(self.registered_callbacks.items()):
             try:
-                callback(data)
+                if batch:
+                    callback(readings)
+                else:
+                    for reading in readings:
+                        callback(reading)
             except Exception as e:
                 print(f"Error in callback: {str(e)}")
     
+    def _flush_pending(self):
+        """Write buffered simulated readings to the database in one batch"""
+        with self._pending_lock:
+            pending = self._pending_readings
+            self._pending_readings = []
+        
+        # Skip rows for sensors that were not part of this simulation run
+        pending = [(row, reading) for row, reading in pending
+                   if row['sensor_id'] in self._valid_sensor_ids]
+        try:
+            ids = db.record_soil_moisture_readings_bulk([row for row, _ in pending])
+        except Exception as e:
+            print(f"Error saving simulated readings: {str(e)}")
+            return
+        
+        # Fill in the database ids on the readings already handed to the UI
+        for (_, reading), reading_id in zip(pending, ids):
+            reading['id'] = reading_id
+    
     def start_simulation(self, user_id):
         """
         Start a background thread that simulates IoT soil moisture sensor data
@@ -48,6 +130,7 @@ class SoilMoistureService:
             return False
         
         self.simulation_running = True
+        self._stop_event.clear()
         self.simulation_thread = threading.Thread(
             target=self._simulation_worker,
             args=(user_id,),
@@ -59,9 +142,12 @@ class SoilMoistureService:
     def stop_simulation(self):
         """Stop the simulation thread"""
         self.simulation_running = False
+        # Wake the worker from its tick wait so it exits straight away
+        self._stop_event.set()
         if self.simulation_thread:
-            self.simulation_thread.join(timeout=1.0)
+            self.simulation_thread.join()
             self.simulation_thread = None
+        self._flush_pending()
     
     def _simulation_worker(self, user_id):
         """
@@ -105,104 +191,129 @@ class SoilMoistureService:
             self.simulation_running = False
             return
         
-        # Create initial sensor states for simulation
-        sensor_states = {}
-        for sensor in sensors:
-            # Start with a random moisture level between 25% and 80%
-            sensor_states[sensor['id']] = {
-                'moisture': random.uniform(25, 80),
-                'moisture_trend': random.choice([-0.1, 0, 0.1]),  # Declining, stable, or rising
-                'temperature': random.uniform(18, 25),
-                'ec': random.uniform(500, 1500),  # Electrical conductivity in µS/cm
-                'battery': random.uniform(70, 100),
-                'signal': random.randint(-90, -50),  # Signal strength in dBm
-                'last_reading': datetime.datetime.now() - datetime.timedelta(
-                    minutes=random.randint(5, 60)
-                )
-            }
+        # Sensors known to exist, so buffered readings need no per-row lookup
+        self._valid_sensor_ids = {sensor['id'] for sensor in sensors}
+        last_flush = time.monotonic()
+        
+        # Database writes run on their own thread so a slow commit never delays
+        # a tick; one worker keeps the batches in order
+        flush_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="soil-flush")
+        
+        # Create initial sensor states for simulation, one array entry per sensor
+        rng = np.random.default_rng()
+        n_sensors = len(sensors)
+        sensor_ids = [sensor['id'] for sensor in sensors]
+        # Start with a random moisture level between 25% and 80%
+        moisture = rng.uniform(25, 80, n_sensors)
+        moisture_trend = rng.choice(_MOISTURE_TRENDS, n_sensors)  # Declining, stable, or rising
+        temperature = rng.uniform(18, 25, n_sensors)
+        ec = rng.uniform(500, 1500, n_sensors)  # Electrical conductivity in µS/cm
+        battery = rng.uniform(70, 100, n_sensors)
+        signal = rng.integers(-90, -49, n_sensors)  # Signal strength in dBm
+        last_reading = time.monotonic() - 60 * rng.integers(5, 61, n_sensors)
         
         # Simulation loop
         while self.simulation_running:
-            # Determine which sensor to update (random selection)
-            sensor = random.choice(sensors)
-            sensor_id = sensor['id']
-            state = sensor_states[sensor_id]
+            # Calculate time since each sensor's last reading (monotonic, so wall
+            # clock adjustments can't skew it; wall time is only stamped on readings)
+            now = time.monotonic()
+            time_diff = (now - last_reading) / 60  # minutes
             
-            # Calculate time since last reading
-            now = datetime.datetime.now()
-            time_diff = (now - state['last_reading']).total_seconds() / 60  # minutes
+            # Draw every uniform this tick needs in one call: one row per use
+            (moisture_rate, moisture_noise, trend_roll, trend_pick,
+             temp_noise, ec_noise, signal_noise) = rng.random((7, n_sensors))
             
-            # Update the sensor state with realistic changes
+            # Update every sensor's state with realistic changes
             
             # 1. Moisture level - changes slowly based on trend
-            moisture_change = state['moisture_trend'] * time_diff * random.uniform(0.01, 0.05)
+            moisture += moisture_trend * time_diff * (0.01 + 0.04 * moisture_rate)
             # Add some randomness to simulate noise
-            moisture_change += random.uniform(-0.2, 0.2)
-            state['moisture'] += moisture_change
+            moisture += 0.4 * moisture_noise - 0.2
             
             # Make sure moisture stays in a realistic range (0-100%)
-            state['moisture'] = max(0, min(100, state['moisture']))
+            np.clip(moisture, 0, 100, out=moisture)
             
             # Occasionally change the trend
-            if random.random() < 0.1:  # 10% chance to change trend
-                state['moisture_trend'] = random.choice([-0.1, 0, 0.1])
+            trend_changes = trend_roll < 0.1  # 10% chance to change trend
+            moisture_trend[trend_changes] = _MOISTURE_TRENDS[
+                (trend_pick[trend_changes] * len(_MOISTURE_TRENDS)).astype(np.intp)
+            ]
             
             # 2. Temperature - changes slowly with small fluctuations
-            temp_change = random.uniform(-0.1, 0.1) * time_diff
-            state['temperature'] += temp_change
+            temperature += (0.2 * temp_noise - 0.1) * time_diff
             # Keep temperature in realistic range
-            state['temperature'] = max(10, min(35, state['temperature']))
+            np.clip(temperature, 10, 35, out=temperature)
             
             # 3. Electrical conductivity - relatively stable
-            ec_change = random.uniform(-5, 5) * time_diff
-            state['ec'] += ec_change
+            ec += (10 * ec_noise - 5) * time_diff
             # Keep EC in realistic range
-            state['ec'] = max(100, min(3000, state['ec']))
+            np.clip(ec, 100, 3000, out=ec)
             
             # 4. Battery - slowly decreases
-            battery_change = -0.01 * time_diff  # Decrease about 1% per 100 minutes
-            state['battery'] += battery_change
+            battery -= 0.01 * time_diff  # Decrease about 1% per 100 minutes
             
-            # 5. Signal strength - fluctuates a bit
-            signal_change = random.randint(-2, 2)
-            state['signal'] += signal_change
+            # 5. Signal strength - fluctuates a bit (-2 to +2 dBm)
+            signal += (signal_noise * 5).astype(signal.dtype) - 2
             # Keep signal in realistic range
-            state['signal'] = max(-100, min(-40, state['signal']))
+            np.clip(signal, -100, -40, out=signal)
             
             # Update last reading time
-            state['last_reading'] = now
+            last_reading[:] = now
             
-            # Record the reading in the database
-            reading = db.record_soil_moisture_reading(
-                sensor_id=sensor_id,
-                moisture_percentage=state['moisture'],
-                temperature=state['temperature'],
-                electrical_conductivity=state['ec'],
-                battery_level=state['battery'],
-                signal_strength=state['signal']
-            )
+            # Buffer the readings for the next batched database write
+            recorded_at = datetime.datetime.utcnow()
+            readings = [
+                {
+                    'id': None,  # Assigned once the batch is written
+                    'recorded_at': recorded_at,
+                    'sensor_id': sensor_id,
+                    'moisture_percentage': moisture_value,
+                    'temperature': temperature_value,
+                    'electrical_conductivity': ec_value,
+                    'battery_level': battery_value,
+                    'signal_strength': signal_value
+                }
+                for sensor_id, moisture_value, temperature_value, ec_value, battery_value, signal_value
+                in zip(sensor_ids, moisture.tolist(), temperature.tolist(), ec.tolist(),
+                       battery.tolist(), signal.tolist())
+            ]
+            with self._pending_lock:
+                # Pair each database row with the reading shown in the UI
+                self._pending_readings.extend(
+                    ({key: value for key, value in reading.items() if key != 'id'}, reading)
+                    for reading in readings
+                )
+                pending_count = len(self._pending_readings)
+            
+            if pending_count >= _FLUSH_ROWS or time.monotonic() - last_flush >= _FLUSH_SECONDS:
+                flush_executor.submit(self._flush_pending)
+                last_flush = time.monotonic()
             
-            # Add sensor context to the reading
-            if reading:
+            for sensor, reading in zip(sensors, readings):
+                # Add sensor context to the reading
                 reading['sensor_name'] = sensor['name']
                 reading['location_name'] = sensor['location_name']
                 reading['depth'] = sensor['depth']
                 reading['sensor_type'] = sensor['sensor_type']
                 reading['field_area'] = sensor['field_area']
                 
-                # Push to queue for real-time updates
-                self.data_queue.put(reading)
-                
-                # Notify callbacks
-                self._notify_callbacks(reading)
+                # Push to the buffer for real-time updates
+                self.data_buffer.append(reading)
             
-            # Sleep for a random interval (1-5 seconds for simulation)
+            # Notify callbacks once with the whole tick
+            self._notify_callbacks(readings)
+            
+            # Wait for the next tick; stop_simulation interrupts the wait
             # In a real app with real sensors, this would be driven by actual sensor data
-            time.sleep(random.uniform(1, 5))
+            self._stop_event.wait(_TICK_SECONDS)
+        
+        # Persist whatever is still buffered when the simulation stops
+        flush_executor.submit(self._flush_pending)
+        flush_executor.shutdown(wait=True)
     
     def get_latest_readings(self, max_items=10):
         """
-        Get the latest readings from the queue without waiting
+        Get the latest readings from the buffer without waiting
         
         Args:
             max_items (int): Maximum number of readings to retrieve
@@ -210,13 +321,9 @@ class SoilMoistureService:
         Returns:
             list: List of the latest sensor readings
         """
-        readings = []
-        for _ in range(min(max_items, self.data_queue.qsize())):
-            if not self.data_queue.empty():
-                readings.append(self.data_queue.get())
-            else:
-                break
-        return readings
+        # deque.popleft is atomic, so no lock is needed against the worker
+        buffer = self.data_buffer
+        return [buffer.popleft() for _ in range(min(max_items, len(buffer)))]
     
     def get_moisture_status(self, moisture_level):
         """
@@ -226,38 +333,9 @@ class SoilMoistureService:
             moisture_level (float): Soil moisture percentage (0-100)
             
         Returns:
-            dict: Status and recommendations
+            dict: Status and recommendations (shared; do not modify)
         """
-        if moisture_level < 20:
-            return {
-                "status": "Critically Dry",
-                "condition": "danger",
-                "recommendation": "Immediate irrigation needed. Plants may be experiencing severe water stress."
-            }
-        elif moisture_level < 35:
-            return {
-                "status": "Dry",
-                "condition": "warning",
-                "recommendation": "Schedule irrigation soon. Soil moisture approaching critical levels."
-            }
-        elif moisture_level < 65:
-            return {
-                "status": "Optimal",
-                "condition": "good",
-                "recommendation": "Moisture levels ideal. Maintain current irrigation schedule."
-            }
-        elif moisture_level < 80:
-            return {
-                "status": "Moist",
-                "condition": "moderate",
-                "recommendation": "Moisture adequate. Consider reducing irrigation frequency."
-            }
-        else:
-            return {
-                "status": "Saturated",
-                "condition": "danger",
-                "recommendation": "Soil over-saturated. Pause irrigation to prevent root rot and nutrient leaching."
-            }
+        return _MOISTURE_BANDS[bisect_right(_MOISTURE_THRESHOLDS, moisture_level)]
 
 # Create a singleton instance
 soil_moisture_service = SoilMoistureService()
\ No newline at end of file
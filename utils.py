@@ -1,20 +1,179 @@
 import os
 import json
+import bisect
+import functools
 import requests
 import datetime
 import pickle
+import mmap
+import numpy as np
+import tempfile
 import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared Nominatim session: reuses the connection between lookups and carries
+# the User-Agent header required by the Nominatim usage policy
+_NOMINATIM_SESSION = requests.Session()
+_NOMINATIM_SESSION.headers.update({"User-Agent": "FarmWeatherAIAdvisor/1.0"})
+
+# (connect, read) timeouts in seconds for geocoding requests
+_GEOCODE_TIMEOUT = (3.05, 5)
+
+# Hours to cache geocoding results: coordinates don't move, but a query with
+# no match is retried sooner in case it was a transient Nominatim gap
+_GEOCODE_HIT_HOURS = 24 * 365
+_GEOCODE_MISS_HOURS = 1
+
+# Nominatim's usage policy allows at most one request per second; the limiter
+# is shared by every thread that geocodes
+_GEOCODE_MIN_INTERVAL = 1.0
+_GEOCODE_RATE_LOCK = threading.Lock()
+_next_geocode_at = 0.0
+
+# Transient Nominatim failures are retried by _nominatim_get, through the
+# rate limiter, backing off _GEOCODE_BACKOFF * 2**attempt seconds (or longer
+# if a Retry-After header asks) but never waiting over _GEOCODE_MAX_BACKOFF
+_GEOCODE_ATTEMPTS = 3
+_GEOCODE_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_GEOCODE_BACKOFF = 1.0
+_GEOCODE_MAX_BACKOFF = 30.0
+
+# Threads used by get_state_coordinates_many to overlap request latency
+_GEOCODE_WORKERS = 4
+
+# In-process layer over the file cache: cache_id -> (expiry, data), kept in
+# least-recently-used order and capped at _MEM_CACHE_SIZE entries
+_MEM_CACHE = OrderedDict()
+_MEM_CACHE_SIZE = 128
+_MEM_CACHE_LOCK = threading.RLock()
+
+def _remember(cache_id, expiry, data):
+    """Store an entry in the in-process cache, evicting the least recently used"""
+    with _MEM_CACHE_LOCK:
+        _MEM_CACHE[cache_id] = (expiry, data)
+        _MEM_CACHE.move_to_end(cache_id)
+        if len(_MEM_CACHE) > _MEM_CACHE_SIZE:
+            _MEM_CACHE.popitem(last=False)
+
+# Minimum seconds between sweeps of expired files out of the cache directory;
+# hour-bucketed keys are never read again, so nothing else would remove them
+_SWEEP_INTERVAL = 3600.0
+_next_sweep = 0.0
+
+# Millimetres per inch for the rainfall conversions
+_MM_PER_INCH = 25.4
+
+# Absolute latitude limits of the tropical, subtropical, temperate and cold
+# temperate bands; anything beyond the last is subarctic/arctic
+_CLIMATE_BAND_LIMITS = (23.5, 35, 45, 55)
+
+# Growing season (start_month, end_month) per band, from tropical (year-round)
+# to subarctic; the southern hemisphere has its seasons reversed
+_NORTHERN_GROWING_SEASONS = ((1, 12), (3, 11), (4, 10), (5, 9), (6, 8))
+_SOUTHERN_GROWING_SEASONS = ((1, 12), (9, 5), (10, 4), (11, 3), (12, 2))
 
 def get_state_coordinates(location_query):
     """
     Get the latitude and longitude for a location query string
     
+    Results are cached on disk: found coordinates for a year, and queries
+    Nominatim answered with no match for an hour.
+    
     Args:
         location_query (str): Location query (e.g., "Mumbai, Maharashtra, India", "北京市, 中国")
     
     Returns:
         tuple: (latitude, longitude) coordinates
     """
+    cache_id = f"geo_{location_query.strip().lower()}"
+    cached = load_cached_data(cache_id)
+    if cached is not None:
+        return cached
+    
+    coordinates, answered = _geocode(location_query)
+    # Only cache definitive answers; failed requests are retried next time
+    if answered:
+        found = coordinates[0] is not None
+        cache_data(cache_id, coordinates, expiry_hours=_GEOCODE_HIT_HOURS if found else _GEOCODE_MISS_HOURS)
+    return coordinates
+
+def get_state_coordinates_many(location_queries):
+    """
+    Get the latitude and longitude for several location query strings
+    
+    Each distinct query is looked up once. Cached ones are answered straight
+    away and the rest are sent to Nominatim from a small thread pool, so their
+    round trips overlap while still respecting the rate limit.
+    
+    Args:
+        location_queries (list): Location query strings
+    
+    Returns:
+        list: (latitude, longitude) tuples, in the order of location_queries
+    """
+    unique_queries = list(dict.fromkeys(location_queries))
+    with ThreadPoolExecutor(max_workers=_GEOCODE_WORKERS) as executor:
+        results = dict(zip(unique_queries, executor.map(get_state_coordinates, unique_queries)))
+    return [results[query] for query in location_queries]
+
+def _wait_for_geocode_slot():
+    """Block until the Nominatim rate limit allows another request"""
+    global _next_geocode_at
+    with _GEOCODE_RATE_LOCK:
+        now = time.monotonic()
+        if now < _next_geocode_at:
+            time.sleep(_next_geocode_at - now)
+            now = _next_geocode_at
+        _next_geocode_at = now + _GEOCODE_MIN_INTERVAL
+
+def _defer_geocodes(delay):
+    """Hold back every thread's next Nominatim request by at least delay seconds"""
+    global _next_geocode_at
+    with _GEOCODE_RATE_LOCK:
+        _next_geocode_at = max(_next_geocode_at, time.monotonic() + delay)
+
+def _nominatim_get(url, params):
+    """
+    Send a Nominatim request, retrying connection errors and transient statuses
+    
+    Every attempt, retries included, waits for a rate limit slot.
+    
+    Returns:
+        requests.Response: The last response received
+    """
+    for attempt in range(_GEOCODE_ATTEMPTS):
+        last_attempt = attempt == _GEOCODE_ATTEMPTS - 1
+        _wait_for_geocode_slot()
+        try:
+            response = _NOMINATIM_SESSION.get(url, params=params, timeout=_GEOCODE_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt:
+                raise
+            _defer_geocodes(_GEOCODE_BACKOFF * 2 ** attempt)
+            continue
+        
+        if last_attempt or response.status_code not in _GEOCODE_RETRY_STATUSES:
+            return response
+        
+        # Back off before the retry, longer if the server asked for it
+        delay = _GEOCODE_BACKOFF * 2 ** attempt
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        if delay > _GEOCODE_MAX_BACKOFF:
+            return response
+        _defer_geocodes(delay)
+
+def _geocode(location_query):
+    """
+    Look up a location query with Nominatim
+    
+    Returns:
+        tuple: ((latitude, longitude), answered), where answered is False if
+        the lookup failed rather than finding no match
+    """
     try:
         # Use Nominatim API for geocoding (OpenStreetMap data)
         base_url = "https://nominatim.openstreetmap.org/search"
@@ -27,19 +186,15 @@ def get_state_coordinates(location_query):
             "accept-language": "en,zh,hi"  # Support English, Chinese, and Hindi
         }
         
-        # Add a user agent as required by Nominatim usage policy
-        headers = {
-            "User-Agent": "FarmWeatherAIAdvisor/1.0"
-        }
-        
         # Make the request
-        response = requests.get(base_url, params=params, headers=headers)
+        response = _nominatim_get(base_url, params)
+        answered = response.status_code == 200
         
-        if response.status_code == 200:
+        if answered:
             results = response.json()
             if results:
                 # Return latitude and longitude as floats
-                return float(results[0]["lat"]), float(results[0]["lon"])
+                return (float(results[0]["lat"]), float(results[0]["lon"])), True
             
             # If no results, try with structured parameters for better results with Chinese addresses
             if "中国" in location_query or "China" in location_query:
@@ -60,21 +215,41 @@ def get_state_coordinates(location_query):
                         structured_params["city"] = parts[0]
                 
                 # Make the structured request
-                response = requests.get(base_url, params=structured_params, headers=headers)
+                response = _nominatim_get(base_url, structured_params)
+                answered = response.status_code == 200
                 
-                if response.status_code == 200:
+                if answered:
                     results = response.json()
                     if results:
                         # Return latitude and longitude as floats
-                        return float(results[0]["lat"]), float(results[0]["lon"])
+                        return (float(results[0]["lat"]), float(results[0]["lon"])), True
         
-        # If we get here, something went wrong with the API request
+        # If we get here, there was no match or the API request went wrong
         print(f"Could not find coordinates for {location_query}")
-        return None, None
+        return (None, None), answered
     
     except Exception as e:
         print(f"Error in get_state_coordinates: {str(e)}")
-        return None, None
+        return (None, None), False
+
+class _FilenameTable(dict):
+    """str.translate table mapping characters unsafe in filenames to "_"."""
+    
+    def __missing__(self, code):
+        # Classify each character once, on first sight, then reuse the entry
+        char = chr(code)
+        self[code] = char if char.isalnum() or char in "_-." else "_"
+        return self[code]
+
+_FILENAME_TABLE = _FilenameTable()
+
+def _sanitize(cache_id):
+    """Turn a cache_id into a valid filename stem in a single C-level pass."""
+    return cache_id.translate(_FILENAME_TABLE)
+
+def _cache_path(cache_id):
+    """Path of the pickle file backing a cache_id."""
+    return os.path.join("cache", f"{_sanitize(cache_id)}.pickle")
 
 def cache_data(cache_id, data, expiry_hours=24):
     """
@@ -85,23 +260,41 @@ def cache_data(cache_id, data, expiry_hours=24):
         data: The data to cache
         expiry_hours (int): Number of hours the cache is valid
     """
+    global _next_sweep
     try:
         # Create cache directory if it doesn't exist
         os.makedirs("cache", exist_ok=True)
         
-        # Sanitize the cache_id to create a valid filename
-        sanitized_id = "".join(c if c.isalnum() or c in "_-." else "_" for c in cache_id)
-        cache_file = os.path.join("cache", f"{sanitized_id}.pickle")
+        cache_file = _cache_path(cache_id)
         
-        # Create a cache object with the data and expiry time
+        # Create a cache object with the data and expiry time (UNIX timestamp)
         cache_obj = {
             "data": data,
-            "expiry": datetime.datetime.now() + datetime.timedelta(hours=expiry_hours)
+            "expiry": time.time() + expiry_hours * 3600
         }
         
-        # Write to file
-        with open(cache_file, "wb") as f:
-            pickle.dump(cache_obj, f)
+        # Write to a temporary file and swap it in, so readers never see a
+        # partly written cache file; the newest protocol is the fastest and
+        # most compact, and a large buffer keeps big payloads from many small writes
+        fd, tmp_file = tempfile.mkstemp(dir="cache", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb", buffering=1 << 20) as f:
+                pickle.dump(cache_obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # The file's mtime doubles as its expiry, so staleness can be
+            # checked with a stat instead of unpickling
+            os.utime(tmp_file, (cache_obj["expiry"], cache_obj["expiry"]))
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+        
+        _remember(cache_id, cache_obj["expiry"], data)
+        
+        # Opportunistically clear out expired files, at most once per interval
+        now = time.monotonic()
+        if now >= _next_sweep:
+            _next_sweep = now + _SWEEP_INTERVAL
+            sweep_cache()
             
     except Exception as e:
         print(f"Error caching data: {str(e)}")
@@ -117,25 +310,34 @@ def load_cached_data(cache_id):
         The cached data if valid, None otherwise
     """
     try:
-        # Sanitize the cache_id to create a valid filename
-        sanitized_id = "".join(c if c.isalnum() or c in "_-." else "_" for c in cache_id)
-        cache_file = os.path.join("cache", f"{sanitized_id}.pickle")
-        
-        # Check if cache file exists
-        if not os.path.exists(cache_file):
-            return None
+        # Serve repeat lookups from memory, skipping the disk read and unpickle
+        with _MEM_CACHE_LOCK:
+            entry = _MEM_CACHE.get(cache_id)
+            if entry is not None:
+                if time.time() <= entry[0]:
+                    _MEM_CACHE.move_to_end(cache_id)
+                    return entry[1]
+                del _MEM_CACHE[cache_id]
         
-        # Load cache object
-        with open(cache_file, "rb") as f:
-            cache_obj = pickle.load(f)
+        cache_file = _cache_path(cache_id)
         
-        # Check if cache is expired
-        if datetime.datetime.now() > cache_obj["expiry"]:
+        # Check if cache file exists and, from its mtime, whether it is expired
+        try:
+            expiry = os.stat(cache_file).st_mtime
+        except FileNotFoundError:
+            return None
+        if time.time() > expiry:
             # Cache expired, delete the file
             os.remove(cache_file)
             return None
         
+        # Load cache object straight from the page cache via mmap, without
+        # first copying the file into a bytes buffer
+        with open(cache_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            cache_obj = pickle.loads(mm)
+        
         # Return the cached data
+        _remember(cache_id, cache_obj["expiry"], cache_obj["data"])
         return cache_obj["data"]
     
     except Exception as e:
@@ -143,53 +345,83 @@ def load_cached_data(cache_id):
         # If there's any error loading the cache, return None
         return None
 
+def sweep_cache():
+    """
+    Delete expired files from the cache directory
+    
+    Returns:
+        int: Number of files removed
+    """
+    removed = 0
+    now = time.time()
+    try:
+        with os.scandir("cache") as entries:
+            for entry in entries:
+                if entry.name.endswith(".pickle") and entry.stat().st_mtime < now:
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error sweeping cache: {str(e)}")
+    return removed
+
+def _numeric(values):
+    """Pass scalars, NumPy arrays and pandas objects through; turn lists and tuples into float arrays"""
+    if isinstance(values, (list, tuple)):
+        return np.asarray(values, dtype=np.float64)
+    return values
+
 def fahrenheit_to_celsius(fahrenheit):
     """
     Convert temperature from Fahrenheit to Celsius
     
     Args:
-        fahrenheit (float): Temperature in Fahrenheit
+        fahrenheit (float or array-like): Temperature(s) in Fahrenheit
     
     Returns:
-        float: Temperature in Celsius
+        float or numpy.ndarray: Temperature(s) in Celsius
     """
-    return (fahrenheit - 32) * 5 / 9
+    return (_numeric(fahrenheit) - 32) * 5 / 9
 
 def celsius_to_fahrenheit(celsius):
     """
     Convert temperature from Celsius to Fahrenheit
     
     Args:
-        celsius (float): Temperature in Celsius
+        celsius (float or array-like): Temperature(s) in Celsius
     
     Returns:
-        float: Temperature in Fahrenheit
+        float or numpy.ndarray: Temperature(s) in Fahrenheit
     """
-    return (celsius * 9 / 5) + 32
+    return (_numeric(celsius) * 9 / 5) + 32
 
 def inches_to_mm(inches):
     """
     Convert precipitation from inches to millimeters
     
     Args:
-        inches (float): Precipitation in inches
+        inches (float or array-like): Precipitation in inches
     
     Returns:
-        float: Precipitation in millimeters
+        float or numpy.ndarray: Precipitation in millimeters
     """
-    return inches * 25.4
+    return _numeric(inches) * _MM_PER_INCH
 
 def mm_to_inches(mm):
     """
     Convert precipitation from millimeters to inches
     
     Args:
-        mm (float): Precipitation in millimeters
+        mm (float or array-like): Precipitation in millimeters
     
     Returns:
-        float: Precipitation in inches
+        float or numpy.ndarray: Precipitation in inches
     """
-    return mm / 25.4
+    return _numeric(mm) / _MM_PER_INCH
 
 def format_datetime(dt, format_str="%Y-%m-%d %H:%M"):
     """
@@ -207,6 +439,7 @@ def format_datetime(dt, format_str="%Y-%m-%d %H:%M"):
     
     return dt.strftime(format_str)
 
+@functools.lru_cache(maxsize=1024)
 def get_growing_season(lat):
     """
     Determine the typical growing season based on latitude
@@ -217,29 +450,7 @@ def get_growing_season(lat):
     Returns:
         tuple: (start_month, end_month) representing the growing season
     """
-    is_northern = lat > 0
-    
-    if is_northern:
-        # Northern hemisphere
-        if abs(lat) < 23.5:  # Tropical
-            return (1, 12)  # Year-round growing
-        elif abs(lat) < 35:  # Subtropical
-            return (3, 11)  # March to November
-        elif abs(lat) < 45:  # Temperate
-            return (4, 10)  # April to October
-        elif abs(lat) < 55:  # Cold temperate
-            return (5, 9)  # May to September
-        else:  # Subarctic/Arctic
-            return (6, 8)  # June to August
-    else:
-        # Southern hemisphere (reversed seasons)
-        if abs(lat) < 23.5:  # Tropical
-            return (1, 12)  # Year-round growing
-        elif abs(lat) < 35:  # Subtropical
-            return (9, 5)  # September to May
-        elif abs(lat) < 45:  # Temperate
-            return (10, 4)  # October to April
-        elif abs(lat) < 55:  # Cold temperate
-            return (11, 3)  # November to March
-        else:  # Subarctic/Antarctic
-            return (12, 2)  # December to February
+    band = bisect.bisect_right(_CLIMATE_BAND_LIMITS, abs(lat))
+    if lat > 0:
+        return _NORTHERN_GROWING_SEASONS[band]
+    return _SOUTHERN_GROWING_SEASONS[band]
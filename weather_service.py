@@ -1,9 +1,169 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import datetime
 import time
 import json
+import math
 import random  # For generating mock data when API limits are hit
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from utils import cache_data, load_cached_data
+
+# (connect, read) timeouts in seconds for every OpenWeather request
+_REQUEST_TIMEOUT = (3.05, 10)
+
+# One pooled session for every OpenWeather call, so calls reuse keep-alive
+# connections instead of a new TCP + TLS handshake each; transient server
+# errors are retried with short backoffs only, since callers fall back to
+# sample data (rate limits aren't retried and Retry-After is ignored so a
+# request can't stall for minutes)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=frozenset({"GET"}),
+    respect_retry_after_header=False,
+    raise_on_status=False
+)))
+_SESSION.headers.update({"Accept": "application/json"})
+
+# Threads for issuing the independent API calls of get_all concurrently,
+# shared by every WeatherService (and so every user session)
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="weather")
+
+# Field getters for the nested dicts of each /forecast list entry
+_MAIN_GET = itemgetter('temp', 'feels_like', 'temp_min', 'temp_max', 'pressure', 'humidity')
+_WX_GET = itemgetter('description', 'icon')
+_WIND_GET = itemgetter('speed', 'deg')
+# Shared stand-in for an absent rain/snow block; never mutated
+_EMPTY = {}
+
+# Forecast fields scanned by get_weather_alerts, as columns
+_ALERT_FIELDS = itemgetter('timestamp', 'temp', 'rain', 'wind_speed')
+
+# Fixed fields of each weather alert; get_weather_alerts adds the time range
+# and description
+_ALERT_HEAT = {
+    'title': '🔥 Extreme Heat Warning',
+    'severity': 'Severe',
+    'agricultural_impact': 'High temperatures can cause crop stress, increased water needs, and may lead to heat damage. Flowering crops are particularly vulnerable.',
+    'recommended_action': 'Increase irrigation frequency, consider temporary shade for sensitive crops, and avoid midday field operations.'
+}
+
+_ALERT_FROST = {
+    'title': '❄️ Frost Warning',
+    'severity': 'Severe',
+    'agricultural_impact': 'Frost can damage or kill crops, especially vulnerable seedlings and flowering plants.',
+    'recommended_action': 'Cover sensitive crops, use frost protection methods, and delay planting of new seedlings.'
+}
+
+_ALERT_HEAVY_RAIN = {
+    'title': '🌧️ Heavy Rain Alert',
+    'severity': 'Moderate',
+    'agricultural_impact': 'Heavy rain may cause soil erosion, waterlogging, and increase disease pressure in crops.',
+    'recommended_action': 'Check drainage systems, secure young plants, and consider delaying pesticide application.'
+}
+
+_ALERT_CUMULATIVE_RAIN = {
+    'title': '💧 High Cumulative Rainfall',
+    'severity': 'Moderate',
+    'agricultural_impact': 'Persistent wet conditions increase disease risk and may delay field operations.',
+    'recommended_action': 'Monitor low-lying areas for flooding, check crop health for signs of disease, and plan field operations accordingly.'
+}
+
+_ALERT_WIND = {
+    'title': '💨 Strong Wind Warning',
+    'severity': 'Moderate',
+    'agricultural_impact': 'Strong winds may damage tall crops, increase water loss through evaporation, and hamper spraying operations.',
+    'recommended_action': 'Secure agricultural structures, provide windbreaks for vulnerable crops, and avoid spraying operations during windy periods.'
+}
+
+_ALERT_DRY = {
+    'title': '🏜️ Dry Conditions Alert',
+    'severity': 'Mild',
+    'agricultural_impact': 'Extended dry conditions may lead to soil moisture depletion and water stress in crops.',
+    'recommended_action': 'Monitor soil moisture levels, prioritize irrigation for critical growth stages, and consider mulching to conserve soil moisture.'
+}
+
+def _time_span(forecast_data, timestamps, mask):
+    """Times of the earliest and latest forecast points selected by mask"""
+    masked = np.where(mask, timestamps, np.nan)
+    return forecast_data[np.nanargmin(masked)]['time'], forecast_data[np.nanargmax(masked)]['time']
+
+def _historical_columns(abs_lat, is_northern, months, uniforms):
+    """
+    Compute the numeric columns of generated historical weather
+    
+    Args:
+        abs_lat (float): Absolute latitude of the location
+        is_northern (bool): Whether the location is in the northern hemisphere
+        months (np.ndarray): Month (1-12) of each day
+        uniforms (np.ndarray): (9, n_days) array of uniform [0, 1) draws
+        
+    Returns:
+        tuple: temp_min, temp_max, temp_avg, humidity, clouds, wind_speed,
+        rain, snow and humidity_avg arrays, one entry per day
+    """
+    (base_draw, min_draw, max_draw, rain_roll, rain_draw,
+     humidity_draw, clouds_draw, wind_draw, humidity_avg_draw) = uniforms
+    
+    # Determine season based on month and hemisphere
+    if is_northern:
+        is_summer = (months >= 5) & (months <= 9)
+        is_winter = (months <= 2) | (months == 12)
+        is_spring = (months >= 3) & (months <= 4)
+        is_fall = (months >= 10) & (months <= 11)
+    else:
+        is_summer = (months >= 11) | (months <= 3)
+        is_winter = (months >= 5) & (months <= 9)
+        is_spring = (months >= 10) & (months <= 11)
+        is_fall = (months >= 4) & (months <= 5)
+    
+    # Base temperature range (low, high) depends on season and region;
+    # tropical regions (within 23.5° of the equator) vary less by season
+    if abs_lat < 23.5:
+        low = np.select([is_summer, is_winter], [26, 22], default=24)
+        high = np.select([is_summer, is_winter], [38, 34], default=36)
+    else:
+        low = np.select([is_summer, is_winter, is_spring], [20, -5, 10], default=5)
+        high = np.select([is_summer, is_winter, is_spring], [35, 15, 25], default=20)
+    base_temp = low + (high - low) * base_draw
+    
+    # Adjust based on latitude (colder at poles)
+    base_temp *= (90 - abs_lat) / 90
+    
+    # Daily min/max variation of 3-8°C
+    temp_min = base_temp - (3 + 5 * min_draw)
+    temp_max = base_temp + (3 + 5 * max_draw)
+    
+    # Precipitation more likely in spring and fall
+    rain_chance = np.select([is_spring | is_fall, is_winter], [0.45, 0.3], default=0.21)
+    rain = np.where(rain_roll < rain_chance, 0.5 + 29.5 * rain_draw, 0.0)
+    
+    # Snow instead of rain in winter if cold enough: convert some or all of it
+    snow_ratio = np.where(
+        is_winter & (temp_min < 2) & (rain > 0),
+        np.clip((2 - temp_min) / 4, 0, 1),
+        0.0
+    )
+    snow = rain * snow_ratio
+    rain = rain * (1 - snow_ratio)
+    
+    return (
+        np.round(temp_min, 1),
+        np.round(temp_max, 1),
+        np.round((temp_min + temp_max) / 2, 1),
+        30 + (66 * humidity_draw).astype(np.int64),
+        (101 * clouds_draw).astype(np.int64),
+        1 + 14 * wind_draw,
+        np.round(rain, 1),
+        np.round(snow, 1),
+        30 + (66 * humidity_avg_draw).astype(np.int64)
+    )
 
 class WeatherService:
     """Service for fetching weather data from external APIs"""
@@ -13,6 +173,49 @@ class WeatherService:
         self.api_key = os.getenv("OPENWEATHER_API_KEY", "defaultkey")
         self.base_url = "https://api.openweathermap.org/data/2.5"
         
+        # Module-level, so the instances the apps create on every Streamlit
+        # rerun all share one connection pool and one thread pool
+        self.session = _SESSION
+        self._executor = _EXECUTOR
+        
+        # Random sources for the sample data served when the API fails
+        self._rng = random.Random()
+        self._np_rng = np.random.default_rng()
+        
+    def _query_params(self, lat, lon, **extra):
+        """Build the query parameters shared by every OpenWeather request"""
+        return {'lat': lat, 'lon': lon, 'units': 'metric', 'appid': self.api_key, **extra}
+    
+    def _fetch_onecall(self, lat, lon):
+        """
+        Fetch the One Call payload for a location, at most once per hour
+        
+        Args:
+            lat (float): Latitude of the location
+            lon (float): Longitude of the location
+            
+        Returns:
+            dict: Parsed API response, or None if the request failed
+        """
+        # The hour is part of the key, so a new hour is simply a cache miss
+        cache_id = f"onecall_{lat:.3f}_{lon:.3f}_{int(time.time() // 3600)}"
+        data = load_cached_data(cache_id)
+        if data is not None:
+            return data
+        
+        response = self.session.get(
+            f"{self.base_url}/onecall",
+            params=self._query_params(lat, lon, exclude='minutely,alerts'),
+            timeout=_REQUEST_TIMEOUT
+        )
+        if response.status_code != 200:
+            print(f"Error fetching One Call data: {response.status_code}")
+            return None
+        
+        data = response.json()
+        cache_data(cache_id, data, expiry_hours=1)
+        return data
+    
     def get_current_weather(self, lat, lon):
         """
         Fetch current weather data for a specific location
@@ -25,8 +228,11 @@ class WeatherService:
             dict: Current weather data
         """
         try:
-            url = f"{self.base_url}/weather?lat={lat}&lon={lon}&units=metric&appid={self.api_key}"
-            response = requests.get(url)
+            response = self.session.get(
+                f"{self.base_url}/weather",
+                params=self._query_params(lat, lon),
+                timeout=_REQUEST_TIMEOUT
+            )
             
             if response.status_code == 200:
                 data = response.json()
@@ -80,8 +286,11 @@ class WeatherService:
             list: List of forecast data points
         """
         try:
-            url = f"{self.base_url}/forecast?lat={lat}&lon={lon}&units=metric&appid={self.api_key}"
-            response = requests.get(url)
+            response = self.session.get(
+                f"{self.base_url}/forecast",
+                params=self._query_params(lat, lon),
+                timeout=_REQUEST_TIMEOUT
+            )
             
             if response.status_code == 200:
                 data = response.json()
@@ -90,22 +299,27 @@ class WeatherService:
                 forecast_data = []
                 
                 for item in data['list']:
+                    # Pull the nested fields out in one C-level call per sub-dict
+                    temp, feels_like, temp_min, temp_max, pressure, humidity = _MAIN_GET(item['main'])
+                    description, icon = _WX_GET(item['weather'][0])
+                    wind_speed, wind_direction = _WIND_GET(item['wind'])
+                    
                     forecast_point = {
                         'timestamp': item['dt'],
                         'time': datetime.datetime.fromtimestamp(item['dt']),
-                        'temp': item['main']['temp'],
-                        'feels_like': item['main']['feels_like'],
-                        'temp_min': item['main']['temp_min'],
-                        'temp_max': item['main']['temp_max'],
-                        'pressure': item['main']['pressure'],
-                        'humidity': item['main']['humidity'],
-                        'description': item['weather'][0]['description'],
-                        'icon': item['weather'][0]['icon'],
+                        'temp': temp,
+                        'feels_like': feels_like,
+                        'temp_min': temp_min,
+                        'temp_max': temp_max,
+                        'pressure': pressure,
+                        'humidity': humidity,
+                        'description': description,
+                        'icon': icon,
                         'clouds': item['clouds']['all'],
-                        'wind_speed': item['wind']['speed'],
-                        'wind_direction': item['wind']['deg'],
-                        'rain': item.get('rain', {}).get('3h', 0),
-                        'snow': item.get('snow', {}).get('3h', 0)
+                        'wind_speed': wind_speed,
+                        'wind_direction': wind_direction,
+                        'rain': item.get('rain', _EMPTY).get('3h', 0),
+                        'snow': item.get('snow', _EMPTY).get('3h', 0)
                     }
                     
                     forecast_data.append(forecast_point)
@@ -143,12 +357,9 @@ class WeatherService:
             
             # If start_timestamp is within the last 5 days, we can use One Call API
             if start_timestamp >= five_days_ago:
-                url = f"{self.base_url}/onecall?lat={lat}&lon={lon}&units=metric&exclude=minutely,alerts&appid={self.api_key}"
-                response = requests.get(url)
+                data = self._fetch_onecall(lat, lon)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    
+                if data is not None:
                     # Process data from OneCall API
                     historical_data = []
                     
@@ -180,6 +391,29 @@ class WeatherService:
             # Generate sample historical data
             return self._generate_historical_data(lat, lon, start_timestamp, end_timestamp)
     
+    def get_all(self, lat, lon, start_timestamp, end_timestamp):
+        """
+        Fetch current weather, forecast and historical data concurrently
+        
+        The three requests are independent, so this takes as long as the
+        slowest one rather than the sum of all three.
+        
+        Args:
+            lat (float): Latitude of the location
+            lon (float): Longitude of the location
+            start_timestamp (float): Start of the historical range in Unix timestamp
+            end_timestamp (float): End of the historical range in Unix timestamp
+            
+        Returns:
+            tuple: (current weather dict, forecast list, historical data list)
+        """
+        current = self._executor.submit(self.get_current_weather, lat, lon)
+        forecast = self._executor.submit(self.get_forecast, lat, lon)
+        historical = self._executor.submit(
+            self.get_historical_data, lat, lon, start_timestamp, end_timestamp
+        )
+        return current.result(), forecast.result(), historical.result()
+    
     def get_weather_alerts(self, lat, lon, forecast_data):
         """
         Generate weather alerts based on forecast data
@@ -193,113 +427,92 @@ class WeatherService:
             list: List of weather alerts
         """
         alerts = []
+        if not forecast_data:
+            return alerts
         
-        # Check for extreme temperatures
-        max_temp = max(item['temp'] for item in forecast_data)
-        min_temp = min(item['temp'] for item in forecast_data)
-        
-        # Check for heavy precipitation
-        max_rain_3h = max(item['rain'] for item in forecast_data)
-        total_rain = sum(item['rain'] for item in forecast_data)
-        
-        # Check for strong winds
-        max_wind = max(item['wind_speed'] for item in forecast_data)
+        # Columnar (struct-of-arrays) view of the forecast, so the extremes,
+        # rain total and threshold masks are all C-level array operations
+        timestamps, temps, rains, winds = np.array(
+            list(map(_ALERT_FIELDS, forecast_data)), dtype=np.float64
+        ).T
+        max_temp = temps.max()
+        min_temp = temps.min()
+        max_rain_3h = rains.max()
+        total_rain = rains.sum()
+        max_wind = winds.max()
         
         # Temperature alerts
-        if max_temp > 35:
+        high_temp = temps > 35
+        if high_temp.any():
             # Find when the high temperature will occur
-            high_temp_items = [item for item in forecast_data if item['temp'] > 35]
-            if high_temp_items:
-                start_time = min(item['time'] for item in high_temp_items)
-                end_time = max(item['time'] for item in high_temp_items)
-                time_range = f"{start_time.strftime('%a %b %d, %H:%M')} - {end_time.strftime('%a %b %d, %H:%M')}"
-                
-                alerts.append({
-                    'title': '🔥 Extreme Heat Warning',
-                    'severity': 'Severe',
-                    'time_range': time_range,
-                    'description': f'Temperatures are expected to exceed 35°C, with a maximum of {max_temp:.1f}°C.',
-                    'agricultural_impact': 'High temperatures can cause crop stress, increased water needs, and may lead to heat damage. Flowering crops are particularly vulnerable.',
-                    'recommended_action': 'Increase irrigation frequency, consider temporary shade for sensitive crops, and avoid midday field operations.'
-                })
-        
-        if min_temp < 0:
+            start_time, end_time = _time_span(forecast_data, timestamps, high_temp)
+            time_range = f"{start_time.strftime('%a %b %d, %H:%M')} - {end_time.strftime('%a %b %d, %H:%M')}"
+            
+            alerts.append({
+                **_ALERT_HEAT,
+                'time_range': time_range,
+                'description': f'Temperatures are expected to exceed 35°C, with a maximum of {max_temp:.1f}°C.'
+            })
+        
+        low_temp = temps < 0
+        if low_temp.any():
             # Find when the low temperature will occur
-            low_temp_items = [item for item in forecast_data if item['temp'] < 0]
-            if low_temp_items:
-                start_time = min(item['time'] for item in low_temp_items)
-                end_time = max(item['time'] for item in low_temp_items)
-                time_range = f"{start_time.strftime('%a %b %d, %H:%M')} - {end_time.strftime('%a %b %d, %H:%M')}"
-                
-                alerts.append({
-                    'title': '❄️ Frost Warning',
-                    'severity': 'Severe',
-                    'time_range': time_range,
-                    'description': f'Temperatures are expected to drop below freezing, with a minimum of {min_temp:.1f}°C.',
-                    'agricultural_impact': 'Frost can damage or kill crops, especially vulnerable seedlings and flowering plants.',
-                    'recommended_action': 'Cover sensitive crops, use frost protection methods, and delay planting of new seedlings.'
-                })
+            start_time, end_time = _time_span(forecast_data, timestamps, low_temp)
+            time_range = f"{start_time.strftime('%a %b %d, %H:%M')} - {end_time.strftime('%a %b %d, %H:%M')}"
+            
+            alerts.append({
+                **_ALERT_FROST,
+                'time_range': time_range,
+                'description': f'Temperatures are expected to drop below freezing, with a minimum of {min_temp:.1f}°C.'
+            })
         
         # Rain alerts
-        if max_rain_3h > 25:
+        heavy_rain = rains > 25
+        if heavy_rain.any():
             # Find when heavy rain will occur
-            heavy_rain_items = [item for item in forecast_data if item['rain'] > 25]
-            if heavy_rain_items:
-                start_time = min(item['time'] for item in heavy_rain_items)
-                time_range = f"{start_time.strftime('%a %b %d, %H:%M')} onwards"
-                
-                alerts.append({
-                    'title': '🌧️ Heavy Rain Alert',
-                    'severity': 'Moderate',
-                    'time_range': time_range,
-                    'description': f'Heavy rainfall expected with up to {max_rain_3h:.1f}mm in a 3-hour period.',
-                    'agricultural_impact': 'Heavy rain may cause soil erosion, waterlogging, and increase disease pressure in crops.',
-                    'recommended_action': 'Check drainage systems, secure young plants, and consider delaying pesticide application.'
-                })
+            start_time, _ = _time_span(forecast_data, timestamps, heavy_rain)
+            time_range = f"{start_time.strftime('%a %b %d, %H:%M')} onwards"
+            
+            alerts.append({
+                **_ALERT_HEAVY_RAIN,
+                'time_range': time_range,
+                'description': f'Heavy rainfall expected with up to {max_rain_3h:.1f}mm in a 3-hour period.'
+            })
         
         if total_rain > 50:
             alerts.append({
-                'title': '💧 High Cumulative Rainfall',
-                'severity': 'Moderate',
+                **_ALERT_CUMULATIVE_RAIN,
                 'time_range': f"Next {len(forecast_data)//8} days",
-                'description': f'Total expected rainfall of {total_rain:.1f}mm over the forecast period.',
-                'agricultural_impact': 'Persistent wet conditions increase disease risk and may delay field operations.',
-                'recommended_action': 'Monitor low-lying areas for flooding, check crop health for signs of disease, and plan field operations accordingly.'
+                'description': f'Total expected rainfall of {total_rain:.1f}mm over the forecast period.'
             })
         
         # Wind alerts
-        if max_wind > 10:
+        strong_wind = winds > 10
+        if strong_wind.any():
             # Find when strong winds will occur
-            strong_wind_items = [item for item in forecast_data if item['wind_speed'] > 10]
-            if strong_wind_items:
-                start_time = min(item['time'] for item in strong_wind_items)
-                end_time = max(item['time'] for item in strong_wind_items)
-                time_range = f"{start_time.strftime('%a %b %d, %H:%M')} - {end_time.strftime('%a %b %d, %H:%M')}"
-                
-                alerts.append({
-                    'title': '💨 Strong Wind Warning',
-                    'severity': 'Moderate',
-                    'time_range': time_range,
-                    'description': f'Strong winds expected with speeds up to {max_wind:.1f}m/s.',
-                    'agricultural_impact': 'Strong winds may damage tall crops, increase water loss through evaporation, and hamper spraying operations.',
-                    'recommended_action': 'Secure agricultural structures, provide windbreaks for vulnerable crops, and avoid spraying operations during windy periods.'
-                })
+            start_time, end_time = _time_span(forecast_data, timestamps, strong_wind)
+            time_range = f"{start_time.strftime('%a %b %d, %H:%M')} - {end_time.strftime('%a %b %d, %H:%M')}"
+            
+            alerts.append({
+                **_ALERT_WIND,
+                'time_range': time_range,
+                'description': f'Strong winds expected with speeds up to {max_wind:.1f}m/s.'
+            })
         
         # Drought indicator (if no significant rain in forecast)
         if total_rain < 5 and len(forecast_data) >= 40:  # At least 5 days of forecast
             alerts.append({
-                'title': '🏜️ Dry Conditions Alert',
-                'severity': 'Mild',
+                **_ALERT_DRY,
                 'time_range': f"Next {len(forecast_data)//8} days",
-                'description': f'Limited rainfall expected ({total_rain:.1f}mm) over the forecast period.',
-                'agricultural_impact': 'Extended dry conditions may lead to soil moisture depletion and water stress in crops.',
-                'recommended_action': 'Monitor soil moisture levels, prioritize irrigation for critical growth stages, and consider mulching to conserve soil moisture.'
+                'description': f'Limited rainfall expected ({total_rain:.1f}mm) over the forecast period.'
             })
         
         return alerts
     
     def _get_sample_current_weather(self, lat, lon):
         """Generate sample current weather data when API calls fail"""
+        rng = self._rng
+        
         # Generate realistic sample data based on latitude
         is_northern = lat > 0
         current_month = datetime.datetime.now().month
@@ -317,15 +530,15 @@ class WeatherService:
         if is_tropical:
             # Tropical regions have less seasonal variation
             if is_summer:
-                temp = random.uniform(26, 38)
+                temp = rng.uniform(26, 38)
             else:
-                temp = random.uniform(22, 34)
+                temp = rng.uniform(22, 34)
         else:
             # Non-tropical regions
             if is_summer:
-                temp = random.uniform(20, 35)
+                temp = rng.uniform(20, 35)
             else:
-                temp = random.uniform(0, 20)
+                temp = rng.uniform(0, 20)
         
         # Adjust based on absolute latitude (colder at poles)
         temp_adjustment = (90 - abs(lat)) / 90 * 20
@@ -334,16 +547,16 @@ class WeatherService:
         # Create sample data
         return {
             'temperature': round(temp, 1),
-            'feels_like': round(temp + random.uniform(-2, 2), 1),
-            'temp_min': round(temp - random.uniform(1, 5), 1),
-            'temp_max': round(temp + random.uniform(1, 5), 1),
-            'pressure': random.randint(990, 1030),
-            'humidity': random.randint(30, 95),
-            'visibility': random.randint(5000, 10000),
-            'wind_speed': random.uniform(1, 10),
-            'wind_direction': random.randint(0, 359),
-            'clouds': random.randint(0, 100),
-            'description': random.choice(['clear sky', 'few clouds', 'scattered clouds', 'broken clouds', 'shower rain', 'rain', 'thunderstorm', 'snow', 'mist']),
+            'feels_like': round(temp + rng.uniform(-2, 2), 1),
+            'temp_min': round(temp - rng.uniform(1, 5), 1),
+            'temp_max': round(temp + rng.uniform(1, 5), 1),
+            'pressure': rng.randint(990, 1030),
+            'humidity': rng.randint(30, 95),
+            'visibility': rng.randint(5000, 10000),
+            'wind_speed': rng.uniform(1, 10),
+            'wind_direction': rng.randint(0, 359),
+            'clouds': rng.randint(0, 100),
+            'description': rng.choice(['clear sky', 'few clouds', 'scattered clouds', 'broken clouds', 'shower rain', 'rain', 'thunderstorm', 'snow', 'mist']),
             'icon': '01d',
             'sunrise': int(time.time() - 3600 * 6),  # 6 hours ago
             'sunset': int(time.time() + 3600 * 6),   # 6 hours from now
@@ -353,6 +566,7 @@ class WeatherService:
     
     def _get_sample_forecast(self, lat, lon):
         """Generate sample forecast data when API calls fail"""
+        rng = self._rng
         forecast_data = []
         current_time = int(time.time())
         
@@ -368,11 +582,11 @@ class WeatherService:
             temp_adjustment = (90 - abs(lat)) / 90
             base_temp = base_temp * temp_adjustment
             
-            temp = base_temp + random.uniform(-3, 3)
+            temp = base_temp + rng.uniform(-3, 3)
             
             # Generate precipitation (more likely if temperature is moderate)
             rain_chance = 0.3 - abs(temp - 15) / 30  # Highest chance around 15°C
-            rain = random.uniform(0, 15) if random.random() < rain_chance else 0
+            rain = rng.uniform(0, 15) if rng.random() < rain_chance else 0
             
             # Snow instead of rain if temperature is below 2°C
             snow = 0
@@ -384,16 +598,16 @@ class WeatherService:
                 'timestamp': timestamp,
                 'time': time_obj,
                 'temp': round(temp, 1),
-                'feels_like': round(temp + random.uniform(-2, 2), 1),
-                'temp_min': round(temp - random.uniform(1, 3), 1),
-                'temp_max': round(temp + random.uniform(1, 3), 1),
-                'pressure': random.randint(990, 1030),
-                'humidity': random.randint(30, 95),
-                'description': random.choice(['clear sky', 'few clouds', 'scattered clouds', 'broken clouds', 'shower rain', 'rain', 'thunderstorm', 'snow', 'mist']),
+                'feels_like': round(temp + rng.uniform(-2, 2), 1),
+                'temp_min': round(temp - rng.uniform(1, 3), 1),
+                'temp_max': round(temp + rng.uniform(1, 3), 1),
+                'pressure': rng.randint(990, 1030),
+                'humidity': rng.randint(30, 95),
+                'description': rng.choice(['clear sky', 'few clouds', 'scattered clouds', 'broken clouds', 'shower rain', 'rain', 'thunderstorm', 'snow', 'mist']),
                 'icon': '01d',
-                'clouds': random.randint(0, 100),
-                'wind_speed': random.uniform(1, 10),
-                'wind_direction': random.randint(0, 359),
+                'clouds': rng.randint(0, 100),
+                'wind_speed': rng.uniform(1, 10),
+                'wind_direction': rng.randint(0, 359),
                 'rain': round(rain, 1),
                 'snow': round(snow, 1)
             }
@@ -404,107 +618,55 @@ class WeatherService:
     
     def _generate_historical_data(self, lat, lon, start_timestamp, end_timestamp):
         """Generate realistic historical weather data for a given timeframe"""
-        historical_data = []
-        
-        current_date = datetime.datetime.fromtimestamp(start_timestamp).date()
+        start_date = datetime.datetime.fromtimestamp(start_timestamp).date()
         end_date = datetime.datetime.fromtimestamp(end_timestamp).date()
         
-        # Determine hemisphere and approximate seasons
-        is_northern = lat > 0
+        # Every day in the range, as a NumPy array so each column is drawn at once
+        days = np.arange(np.datetime64(start_date), np.datetime64(end_date) + 1)
+        n_days = len(days)
+        if n_days == 0:
+            return []
+        months = days.astype('datetime64[M]').astype(np.int64) % 12 + 1
         
-        # Generate daily data
-        while current_date <= end_date:
-            # Convert current_date to datetime object at noon
-            current_date_noon = datetime.datetime.combine(current_date, datetime.time(12, 0))
-            timestamp = current_date_noon.timestamp()
-            
-            # Determine season based on month and hemisphere
-            month = current_date.month
-            if is_northern:
-                is_summer = 5 <= month <= 9
-                is_winter = month <= 2 or month == 12
-                is_spring = 3 <= month <= 4
-                is_fall = 10 <= month <= 11
-            else:
-                is_summer = 11 <= month or month <= 3
-                is_winter = 5 <= month <= 9
-                is_spring = 10 <= month <= 11
-                is_fall = 4 <= month <= 5
-            
-            # Adjust for tropical regions (within 23.5° of equator)
-            is_tropical = abs(lat) < 23.5
-            
-            # Base temperature depends on season and region
-            if is_tropical:
-                # Tropical regions have less seasonal variation
-                if is_summer:
-                    base_temp = random.uniform(26, 38)
-                elif is_winter:
-                    base_temp = random.uniform(22, 34)
-                else:  # spring or fall
-                    base_temp = random.uniform(24, 36)
-            else:
-                # Non-tropical regions with more seasonal variation
-                if is_summer:
-                    base_temp = random.uniform(20, 35)
-                elif is_winter:
-                    base_temp = random.uniform(-5, 15)
-                elif is_spring:
-                    base_temp = random.uniform(10, 25)
-                else:  # fall
-                    base_temp = random.uniform(5, 20)
-            
-            # Adjust based on latitude (colder at poles)
-            temp_adjustment = (90 - abs(lat)) / 90
-            base_temp = base_temp * temp_adjustment
-            
-            # Daily min/max variation
-            temp_min = base_temp - random.uniform(3, 8)
-            temp_max = base_temp + random.uniform(3, 8)
-            
-            # Precipitation more likely in spring and fall
-            rain_chance_base = 0.3
-            if is_spring or is_fall:
-                rain_chance = rain_chance_base * 1.5
-            elif is_winter:
-                rain_chance = rain_chance_base
-            else:  # summer
-                rain_chance = rain_chance_base * 0.7
-            
-            rain = 0
-            if random.random() < rain_chance:
-                rain = random.uniform(0.5, 30)
-            
-            # Snow instead of rain in winter if cold enough
-            snow = 0
-            if is_winter and temp_min < 2 and rain > 0:
-                # Convert some or all rain to snow
-                snow_ratio = max(0, min(1, (2 - temp_min) / 4))
-                snow = rain * snow_ratio
-                rain = rain * (1 - snow_ratio)
-            
-            # Generate the data point
-            day_data = {
+        # Draw every uniform up front, one row per use, so the column kernel
+        # is a pure function of its inputs
+        uniforms = self._np_rng.random((9, n_days))
+        (temp_min, temp_max, temp_avg, humidity, clouds, wind_speed,
+         rain, snow, humidity_avg) = _historical_columns(abs(lat), lat > 0, months, uniforms)
+        
+        # Timestamps at local noon of each day
+        dates = days.tolist()
+        noon = datetime.time(12, 0)
+        timestamps = [datetime.datetime.combine(date, noon).timestamp() for date in dates]
+        
+        # Generate the data points
+        return [
+            {
                 'timestamp': timestamp,
-                'date': current_date,
-                'temp_min': round(temp_min, 1),
-                'temp_max': round(temp_max, 1),
-                'temp_avg': round((temp_min + temp_max) / 2, 1),
-                'humidity': random.randint(30, 95),
-                'clouds': random.randint(0, 100),
-                'wind_speed': random.uniform(1, 15),
-                'rain_sum': round(rain, 1),
-                'snow_sum': round(snow, 1),
-                'humidity_avg': random.randint(30, 95)
+                'date': date,
+                'temp_min': day_min,
+                'temp_max': day_max,
+                'temp_avg': day_avg,
+                'humidity': humidity,
+                'clouds': clouds,
+                'wind_speed': wind_speed,
+                'rain_sum': rain_sum,
+                'snow_sum': snow_sum,
+                'humidity_avg': humidity_avg
             }
-            
-            historical_data.append(day_data)
-            
-            # Move to next day
-            current_date += datetime.timedelta(days=1)
-        
-        return historical_data
+            for timestamp, date, day_min, day_max, day_avg, humidity, clouds,
+                wind_speed, rain_sum, snow_sum, humidity_avg in zip(
+                timestamps,
+                dates,
+                temp_min.tolist(),
+                temp_max.tolist(),
+                temp_avg.tolist(),
+                humidity.tolist(),
+                clouds.tolist(),
+                wind_speed.tolist(),
+                rain.tolist(),
+                snow.tolist(),
+                humidity_avg.tolist()
+            )
+        ]
 
-
-# Add missing import
-import math